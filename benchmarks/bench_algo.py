@@ -0,0 +1,75 @@
+"""
+What ca.choose_algo() picks for a few kinds of pattern, against how long
+bgolly really takes to run each with QuickLife and with HashLife, for
+tuning HASHLIFE_MIN_STEP and the probe.
+
+Needs the bgolly binary in cogs/resources, and discord.py installed for ca to import.
+
+Run from the repo root: python -m benchmarks.bench_algo
+"""
+import os
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from cogs import ca
+from cogs.resources import rle
+
+BGOLLY = os.path.join(os.path.dirname(__file__), '..', 'cogs', 'resources', 'bgolly')
+
+PATTERNS = {
+  'glider': 'bo$2bo$3o!',
+  'glider fleet': '$'.join(['bo$2bo$3o$$$'] * 10) + '!',
+  'gosper gun': (
+    '24bo$22bobo$12b2o6b2o12b2o$11bo3bo4b2o12b2o$2o8bo5bo3b2o$2o8bo3bob2o4bobo$10bo5bo7bo$11bo3bo$12b2o!'
+  ),
+  'r-pentomino': 'b2o$2o$bo!',
+  'acorn': 'bo$3bo$2o2b3o!',
+  **{
+    f'{size}x{size} soup': rle.encode((np.random.default_rng(size).random((size, size)) < 0.4).astype(np.uint8))
+    for size in (32, 128, 512)
+  },
+}
+STEPS = (1, 16, 64, 256, 1024)
+# frames per sim
+FRAMES = 100
+
+
+def bgolly(tmp, algo, text, gen, step):
+    infile, outfile = os.path.join(tmp, 'in.rle'), os.path.join(tmp, 'out.rle')
+    with open(infile, 'w') as f:
+        f.write(text)
+    if os.path.exists(outfile):
+        # bgolly appends
+        os.remove(outfile)
+    start = time.perf_counter()
+    subprocess.run(
+      [BGOLLY, '-a', algo, '-r', 'B3/S23', '-m', str(gen), '-i', str(step), '-o', outfile, infile],
+      check=True, capture_output=True
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    print(f"{'pattern':>14} {'step':>5} {'QuickLife (s)':>14} {'HashLife (s)':>13} {'picked':>10} {'probe (ms)':>11}  reason")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, pat in PATTERNS.items():
+            text = f'x = 0, y = 0, rule = B3/S23\n{pat}\n'
+            for step in STEPS:
+                t_quicklife = bgolly(tmp, 'QuickLife', text, FRAMES * step, step)
+                t_hashlife = bgolly(tmp, 'HashLife', text, FRAMES * step, step)
+                start = time.perf_counter()
+                algo, reason = ca.choose_algo(os.path.join(tmp, 'in.rle'), 'B3/S23', FRAMES * step, step)
+                t_probe = time.perf_counter() - start
+                faster = 'QuickLife' if t_quicklife <= t_hashlife else 'HashLife'
+                print(
+                  f'{name:>14} {step:>5} {t_quicklife:>14.3f} {t_hashlife:>13.3f} '
+                  f"{algo + ('' if algo == faster else '*'):>10} {1000 * t_probe:>11.1f}  {reason}"
+                )
+    print('* slower of the two')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""
+Cross-check of the in-process engines against bgolly, then how long each
+takes to get a sim's generations ready to draw: bgolly (spawning it,
+having it write RLE and reading that back in, as the sim command does)
+against engines.run().
+
+Every generation has to come out the same: position, size and cells.
+Needs the bgolly binary in cogs/resources. tests/test_engines.py checks a
+few of the same rules against stored bgolly output, without needing it.
+
+Run from the repo root: python -m benchmarks.bench_engines
+Add --tiled to have every pattern stepped a tile at a time, as a check on
+the tiled stepper, instead of only those too spread out to step whole.
+"""
+import base64
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from cogs.resources import engines, rle
+
+BGOLLY = os.path.join(os.path.dirname(__file__), '..', 'cogs', 'resources', 'bgolly')
+
+
+def to_map(rule, cells=range(9)):
+    """
+    rule as a MAP rule over the given cells of the 3x3 neighbourhood, worked
+    out by running it on every neighbourhood (bgolly then checks the result)
+    """
+    engine = engines.find(rule)
+    bits = []
+    for index in range(1 << len(cells)):
+        neighbourhood = np.zeros(9, np.uint8)
+        for k, cell in enumerate(cells):
+            neighbourhood[cell] = index >> (len(cells) - 1 - k) & 1
+        bits.append(engine.step(neighbourhood.reshape(3, 3))[2, 2])
+    return 'MAP' + base64.b64encode(np.packbits(bits).tobytes()).decode().rstrip('=')
+
+
+def random_map(n_cells, seed):
+    """A random (so most likely non-totalistic, and anisotropic) MAP rule over n_cells cells, without B0"""
+    bits = np.random.default_rng(seed).integers(0, 2, 1 << n_cells, np.uint8)
+    bits[0] = 0
+    return 'MAP' + base64.b64encode(np.packbits(bits).tobytes()).decode().rstrip('=')
+
+
+def bosco(radius, n_states=0, neighbourhood='M'):
+    """Bosco's rule (R5,C0,M1,S34..58,B34..45,NM) scaled to another range"""
+    size = (2 * radius + 1) ** 2 if neighbourhood == 'M' else 2 * radius * (radius + 1) + 1
+    s_min, s_max, b_max = (max(1, round(size * k)) for k in (34 / 121, 58 / 121, 45 / 121))
+    return f'R{radius},C{n_states},M1,S{s_min}..{s_max},B{s_min}..{b_max},N{neighbourhood}'
+
+
+# (rule, gen, step) to check every pattern under
+CASES = [
+  ('B3/S23', 200, 1),
+  ('B3/S23', 300, 7),
+  ('B36/S23', 200, 3),
+  ('B3678/S34678', 150, 1),
+  ('B1357/S1357', 60, 1),
+  ('B2/S', 40, 1),
+  ('23/3', 100, 1),
+  ('B2/S34H', 150, 1),
+  ('B2/S3H', 100, 2),
+  ('B24/S35H', 100, 1),
+  ('B2/S013V', 100, 1),
+  ('B13/S024V', 60, 1),
+  ('B3/S23V', 100, 1),
+  ('B2-a3/S23-q', 80, 1),
+  ('B2n3/S23-q', 100, 1),
+  ('B3/S23-a4eiktz', 100, 1),
+  ('B34ce5k/S23-c4q', 60, 1),
+  ('B2ce3aiy4t/S1e2-kn3jq', 60, 2),
+  ('2-a3/3', 100, 1),
+  (to_map('B3/S23'), 200, 1),
+  (to_map('B2-a3/S23-q'), 100, 3),
+  (to_map('B2/S34H', (7, 8, 3, 4, 5, 0, 1)), 100, 1),
+  (random_map(7, 1), 60, 1),
+  (random_map(7, 2), 60, 1),
+  (random_map(5, 3), 60, 1),
+  (random_map(9, 4), 60, 1),
+  (to_map('B2/S013V', (1, 3, 4, 5, 7)), 100, 1),
+  ('345/2/4', 150, 1),
+  ('23/3/2', 100, 1),
+  ('12/34/3', 100, 1),
+  ('3467/2/6', 100, 2),
+  ('/2/3', 80, 1),
+  ('2/13/25', 100, 1),
+  ('0123/3/200', 120, 1),
+  ('345/2/4H', 100, 1),
+  ('12/34/3V', 100, 1),
+  ('R5,C0,M1,S34..58,B34..45,NM', 100, 1),
+  ('R2,C4,M0,S2..5,B3..4,NN', 80, 1),
+  ('R3,C0,M0,S8..14,B7..10,NN', 60, 2),
+  ('R1,C3,M1,S2..4,B3..3,NM', 100, 1),
+  *((bosco(radius), 40, 1) for radius in (1, 2, 5, 10, 20, 50, 100)),
+  *((bosco(radius, 3, 'N'), 40, 1) for radius in (1, 2, 5, 10, 20, 50, 100)),
+  ('W30', 200, 1),
+  ('W110', 300, 3),
+  ('W90', 100, 1),
+  ('W184', 100, 1),
+  ('W254', 50, 1),
+  ('W0', 20, 1),
+  ('W030', 60, 2),
+]
+
+
+def soup(size, density, seed):
+    return (np.random.default_rng(seed).random((size, size)) < density).astype(np.uint8)
+
+
+def patterns(n_states, reach):
+    yield 'glider at an offset', np.array([[0, 1, 0], [0, 0, 1], [1, 1, 1]], np.uint8), (-7, 12)
+    for seed, (size, density) in enumerate([(8, 0.5), (16, 0.4), (32, 0.35), (64, 0.3)]):
+        yield f'{size}x{size} soup', soup(size, density, seed), (0, 0)
+    yield '24-cell row', soup(24, 0.5, 24)[:1], (5, 2)
+    if reach > 8:
+        # the soups above are lost in a neighbourhood this big
+        yield f'{4 * reach}x{4 * reach} soup', soup(4 * reach, 0.5, reach), (0, 0)
+    if n_states > 2:
+        # some cells already dying
+        states = np.random.default_rng(n_states).integers(0, n_states, (32, 32), np.uint8)
+        yield '32x32 multistate soup', np.where(soup(32, 0.5, 99), states, 0).astype(np.uint8), (3, -4)
+
+
+def scattered(size, n, seed):
+    """n gliders and small soups strewn over a size x size area"""
+    rng = np.random.default_rng(seed)
+    cells = np.zeros((size, size), np.uint8)
+    glider = np.array([[0, 1, 0], [0, 0, 1], [1, 1, 1]], np.uint8)
+    for i in range(n):
+        y, x = rng.integers(0, size - 16, 2)
+        if i % 4:
+            cells[y:y + 3, x:x + 3] = np.rot90(glider, i)
+        else:
+            cells[y:y + 16, x:x + 16] = soup(16, 0.4, i)
+    return cells
+
+
+# (rule, gen, step) to check scattered patterns under, with (size, n) of each
+SPARSE_CASES = [
+  ('B3/S23', 200, 1, [(1024, 20), (4096, 40), (16384, 40)]),
+  ('B36/S23', 100, 2, [(2048, 30)]),
+  ('B2-a3/S23-q', 100, 1, [(2048, 30)]),
+  ('B2/S34H', 100, 1, [(2048, 30)]),
+  ('345/2/4', 100, 1, [(2048, 30)]),
+  ('R5,C0,M1,S34..58,B34..45,NM', 60, 1, [(2048, 30)]),
+]
+
+
+def bgolly(tmp, cells, pos, rule, gen, step, decode=True):
+    """bgolly's output, with each generation's cells decoded or (if not decode) left as RLE"""
+    infile, outfile = os.path.join(tmp, 'in.rle'), os.path.join(tmp, 'out.rle')
+    with open(infile, 'w') as f:
+        f.write(rle.dump(cells, rule, pos, two_state=cells.max() < 2 and (rule.count('/') < 2 or rule.startswith('MAP')) and ',C' not in rule))
+    if os.path.exists(outfile):
+        # bgolly appends
+        os.remove(outfile)
+    if rule.startswith('R'):
+        algo = 'Larger than Life'
+    else:
+        # (MAP rules can have slashes of their own)
+        algo = 'Generations' if rule.count('/') > 1 and not rule.startswith('MAP') else 'QuickLife'
+    subprocess.run(
+      [BGOLLY, '-a', algo, '-r', rule, '-m', str(gen), '-i', str(step), '-o', outfile, infile],
+      check=True, capture_output=True
+    )
+    out = []
+    with open(outfile) as f:
+        lines = filter(None, map(str.strip, f))
+        for line in lines:
+            if '@COLOR' in line:
+                break
+            pos = tuple(map(int, line.split(',')))
+            size = tuple(map(int, next(lines).split(',')))
+            out.append((pos, size, rle.decode(next(lines)) if decode else next(lines)))
+    return out
+
+
+def engine(cells, pos, rule, gen, step):
+    return engines.run(engines.find(rule), cells, pos, gen, step, max_work=float('inf'), max_cells=float('inf'))
+
+
+def same(expected, got):
+    if len(expected) != len(got):
+        return False
+    for (pos, size, cells), (pos_, size_, cells_) in zip(expected, got):
+        if isinstance(cells, str):
+            cells = rle.decode(cells)
+        if isinstance(cells_, engines.Tiles):
+            cells_, _ = cells_.to_array()
+        width, height = size
+        # bgolly's RLE leaves off trailing dead cells
+        padded = np.zeros((height, width), np.uint8)
+        padded[:cells.shape[0], :cells.shape[1]] = cells
+        if pos != pos_ or size != size_ or not np.array_equal(padded, cells_):
+            return False
+    return True
+
+
+def check_spacetime(tmp, rule, gen):
+    """A one-row pattern's spacetime diagram should be bgolly's last generation of it"""
+    row = soup(24, 0.5, 24)[:1]
+    (_, _, expected), = bgolly(tmp, row, (0, 0), rule, gen, gen)[1:]
+    start = time.perf_counter()
+    got, _ = rle.crop(engines.find(rule).spacetime(row[0], gen))
+    t_engine = time.perf_counter() - start
+    expected, _ = rle.crop(expected)
+    assert np.array_equal(expected, got), f'{rule} spacetime differs from bgolly'
+    print(f'{rule:>28.28} {gen:>4} {"":>4} {"spacetime":>22} {"":>12} {1000 * t_engine:>12.1f}')
+
+
+def main():
+    if '--tiled' in sys.argv:
+        engines.DENSE_MAX_AREA = engines.TILED_MIN_AREA = 0
+    print(f"{'rule':>28.28} {'gen':>4} {'step':>4} {'pattern':>22} {'bgolly (ms)':>12} {'engine (ms)':>12} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rule, gen, step in CASES:
+            if rule.startswith('R'):
+                n_states = int(rule.split(',')[1][1:])
+            else:
+                n_states = int(rule.split('/')[-1].rstrip('HV')) if rule.count('/') > 1 and not rule.startswith('MAP') else 2
+            for name, cells, pos in patterns(n_states, engines.find(rule).reach):
+                start = time.perf_counter()
+                expected = bgolly(tmp, cells, pos, rule, gen, step)
+                t_bgolly = time.perf_counter() - start
+                start = time.perf_counter()
+                got = engine(cells, pos, rule, gen, step)
+                t_engine = time.perf_counter() - start
+                assert same(expected, got), f'{rule} {name} differs from bgolly'
+                print(
+                  f'{rule:>28.28} {gen:>4} {step:>4} {name:>22} '
+                  f'{1000 * t_bgolly:>12.1f} {1000 * t_engine:>12.1f} {t_bgolly / t_engine:>7.1f}x'
+                )
+            if rule.startswith('W'):
+                check_spacetime(tmp, rule, gen)
+        for rule, gen, step, sizes in SPARSE_CASES:
+            for seed, (size, n) in enumerate(sizes):
+                cells = scattered(size, n, seed)
+                body = rle.encode(cells)
+                start = time.perf_counter()
+                # decoding every generation at once would take gigabytes; same() does them one by one
+                expected = bgolly(tmp, cells, (0, 0), rule, gen, step, decode=False)
+                for _, _, generation in expected:
+                    rle.decode(generation)
+                t_bgolly = time.perf_counter() - start
+                start = time.perf_counter()
+                # straight from RLE to tiles, as the sim command's simulate() does it
+                got = engines.run(
+                  engines.find(rule), engines.Tiles.from_cells(*rle.coords(body)), (0, 0), gen, step,
+                  max_work=float('inf'), max_cells=float('inf')
+                )
+                t_engine = time.perf_counter() - start
+                name = f'{n} objects in {size}x{size}'
+                assert same(expected, got), f'{rule} {name} differs from bgolly'
+                print(
+                  f'{rule:>28.28} {gen:>4} {step:>4} {name:>22} '
+                  f'{1000 * t_bgolly:>12.1f} {1000 * t_engine:>12.1f} {t_bgolly / t_engine:>7.1f}x'
+                )
+    for rule in ('B0/S8', 'B0-c/S2', '1/02/3', '2/3/300', 'R5,C0,M1,S34..58,B0..45,NM', 'R2,C1,M0,S2..5,B3..4,NN', 'W31', 'W256', 'B3/S23/3', 'B2y/S23', 'B3/S9', 'B7/S0V', 'B2a/S3H', 'Snowflakes'):
+        assert engines.find(rule) is None, f'{rule} should be left to bgolly'
+
+
+if __name__ == '__main__':
+    main()
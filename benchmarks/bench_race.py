@@ -0,0 +1,80 @@
+"""
+Listeners left behind on the bot, and what they cost the next
+reaction_add dispatch, after N sims/identifies that finished without being cancelled:
+the old mutils.await_event_or_coro() against mutils.race_event().
+
+The bot is a stand-in with just what the two need (`loop` and
+`_listeners`), and dispatch() walks the listeners the same way
+discord.Client.dispatch does in discord.py 1.x. That race_event() leaves
+no listeners behind is tested in tests/test_mutils.py.
+
+Run from the repo root: python -m benchmarks.bench_race
+"""
+import asyncio
+import time
+import types
+
+from cogs.resources import mutils
+
+
+async def old(bot, event, coro, *, event_check=None):
+    # await_event_or_coro as it was, minus its (unused) ret_check
+    future = bot.loop.create_future()
+    event_check = event_check or (lambda *_, **__: True)
+    bot._listeners.setdefault(event, []).append((future, event_check))
+    [done], pending = await asyncio.wait([future, asyncio.ensure_future(coro)], return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    return done.result()
+
+
+def dispatch(bot, event, *args):
+    listeners = bot._listeners.get(event)
+    if not listeners:
+        return
+    removed = []
+    for i, (future, condition) in enumerate(listeners):
+        if future.cancelled():
+            removed.append(i)
+            continue
+        if condition(*args):
+            future.set_result(args)
+            removed.append(i)
+    if len(removed) == len(listeners):
+        bot._listeners.pop(event)
+    else:
+        for idx in reversed(removed):
+            del listeners[idx]
+
+
+async def work():
+    await asyncio.sleep(0)
+    return 'done'
+
+
+def never(*_):
+    return False
+
+
+async def main():
+    print(f"{'races':>6} {'old listeners':>14} {'new listeners':>14} {'old 1st dispatch (us)':>22} {'new 1st dispatch (us)':>22}")
+    for n in (10, 100, 1000, 5000):
+        row = []
+        for race in (old, mutils.race_event):
+            bot = types.SimpleNamespace(loop=asyncio.get_running_loop(), _listeners={})
+            for _ in range(n):
+                if race is old:
+                    await old(bot, 'reaction_add', work(), event_check=never)
+                else:
+                    await race(bot, 'reaction_add', work(), check=never)
+            left = len(bot._listeners.get('reaction_add', []))
+            # only the first dispatch pays: it sweeps out the (cancelled) leftovers
+            start = time.perf_counter()
+            dispatch(bot, 'reaction_add', None, None)
+            row.append((left, time.perf_counter() - start))
+        (old_left, old_t), (new_left, new_t) = row
+        print(f'{n:>6} {old_left:>14} {new_left:>14} {1e6 * old_t:>22.2f} {1e6 * new_t:>22.2f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
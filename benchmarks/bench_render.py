@@ -0,0 +1,44 @@
+"""
+Per-frame cost of scaling a frame up by `mul` (with and without a grid) the
+old way, through two nested mutils.scale() calls over Python lists, against
+cogs.resources.render.upscale().
+
+makeframes picks mul = ceil(100 / min(width, height)), so small patterns
+get big multipliers and anything over 100 cells across gets mul = 1.
+
+Run from the repo root: python -m benchmarks.bench_render
+"""
+import timeit
+
+import numpy as np
+
+from cogs.resources import mutils, render
+
+GRID = 2
+
+
+def old(frame, mul, grid):
+    return np.asarray(
+      mutils.scale(
+        (mutils.scale(row, mul, grid=grid) for row in frame[..., None].tolist()),
+        mul, grid=[grid] if grid is not None else None
+      ),
+      np.uint8
+    )[..., 0]
+
+
+def main():
+    print(f"{'size':>6} {'mul':>4} {'grid':>5} {'old (ms)':>10} {'new (ms)':>10} {'speedup':>8}")
+    for size in (4, 10, 25, 50, 100, 400):
+        mul = -(-100 // size) if size <= 100 else 1
+        frame = (np.random.random((size, size)) < 0.5).astype(np.uint8)
+        for grid in (None, GRID):
+            assert (old(frame, mul, grid) == render.upscale(frame, mul, grid)).all()
+            number = max(1, 20000 // (size * mul) ** 2 * 10)
+            t_old = timeit.timeit(lambda: old(frame, mul, grid), number=number) / number
+            t_new = timeit.timeit(lambda: render.upscale(frame, mul, grid), number=number) / number
+            print(f'{size:>6} {mul:>4} {grid is not None!s:>5} {1000 * t_old:>10.3f} {1000 * t_new:>10.3f} {t_old / t_new:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
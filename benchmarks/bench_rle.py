@@ -0,0 +1,46 @@
+"""
+Compares decoding bgolly's RLE output into frames the old way (expanding
+every run through rRUNS.findall into per-cell RGB lists) against
+cogs.resources.rle.decode() plus a palette lookup.
+
+Run from the repo root: python -m benchmarks.bench_rle
+"""
+import re
+import timeit
+
+import numpy as np
+
+from cogs.resources import rle
+
+rRUNS = re.compile(r'([0-9]*)([a-z][A-Z]|[ob.A-Z])')
+rDOLLARS = re.compile(r'(\d+)\$')
+
+BG, FG = (54, 57, 62), (255, 255, 255)
+COLORS = {'o': FG, 'b': BG}
+
+
+def old(body):
+    rows = rDOLLARS.sub(lambda m: '$' * int(m[1]), body).replace('!', '').split('$')
+    return [
+      [BG if char in '.b' else COLORS[char] for run, char in rRUNS.findall(row) for _ in range(int(run or 1))]
+      for row in rows
+    ]
+
+
+def new(body, lut=rle.palette(COLORS, BG)):
+    return lut[rle.decode(body)]
+
+
+def main():
+    print(f"{'size':>6} {'density':>8} {'old (ms)':>10} {'new (ms)':>10} {'speedup':>8}")
+    for size in (32, 128, 512, 1024):
+        for density in (0.1, 0.5):
+            body = rle.encode(np.random.random((size, size)) < density)
+            number = max(1, 2000 // size)
+            t_old = timeit.timeit(lambda: old(body), number=number) / number
+            t_new = timeit.timeit(lambda: new(body), number=number) / number
+            print(f'{size:>6} {density:>8} {1000 * t_old:>10.2f} {1000 * t_new:>10.2f} {t_old / t_new:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Wall-clock time to simulate and render a long sim that bgolly has to run:
+one bgolly and one render after it (CA.run_bgolly() then CA.do_gif()),
+against CA.segmented_render() splitting it over every core. Every GIF
+has to come out the same, frame for frame.
+
+The cog is a stand-in with just what the two need, so no bot is started.
+Needs the bgolly binary in cogs/resources, and discord.py installed for ca to import.
+
+Run from the repo root: python -m benchmarks.bench_segments
+"""
+import asyncio
+import io
+import os
+import tempfile
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from itertools import zip_longest
+
+import numpy as np
+from PIL import Image
+
+from cogs import ca
+from cogs.resources import rle
+
+# (rule, soup size, gen, step)
+CASES = [
+  ('B3/S23', 64, 2500, 1),
+  ('B3/S23', 128, 2500, 1),
+  ('B36/S23', 64, 2500, 2),
+  ('B3/S23', 256, 5000, 4),
+]
+
+
+def frames(data):
+    """Yield every frame of a GIF, once for each hundredth of a second it shows"""
+    im = Image.open(io.BytesIO(data))
+    for k in range(im.n_frames):
+        im.seek(k)
+        frame = np.asarray(im.convert('RGB'))
+        for _ in range(im.info['duration'] // 10):
+            yield frame
+
+
+def same(expected, got):
+    sentinel = object()
+    return all(
+      a is not sentinel and b is not sentinel and np.array_equal(a, b)
+      for a, b in zip_longest(frames(expected), frames(got), fillvalue=sentinel)
+    )
+
+
+def stand_in(executor):
+    cog = types.SimpleNamespace(
+      dir=os.path.abspath(os.path.dirname(ca.__file__)),
+      loop=asyncio.get_running_loop(),
+      proc_limit=asyncio.Semaphore(os.cpu_count() or 1),
+      segments=os.cpu_count() or 1,
+      execs=[[executor, 'ProcessPoolExecutor']] * 2
+    )
+    for name in ('run_bgolly', 'run_segment', 'run_cancellable', 'n_segments', 'segmented_render', 'do_gif'):
+        setattr(cog, name, types.MethodType(getattr(ca.CA, name), cog))
+    return cog
+
+
+async def main():
+    print(f'{os.cpu_count()} cores')
+    print(f"{'rule':>8} {'soup':>5} {'gen':>5} {'step':>4} {'serial (s)':>11} {'segmented (s)':>14} {'speedup':>8}")
+    with ProcessPoolExecutor() as executor, tempfile.TemporaryDirectory() as tmp:
+        cog = stand_in(executor)
+        current = os.path.join(tmp, 'sim')
+        for seed, (rule, size, gen, step) in enumerate(CASES):
+            cells = (np.random.default_rng(seed).random((size, size)) < 0.4).astype(np.uint8)
+            with open(f'{current}_in.rle', 'w') as f:
+                f.write(rle.dump(cells, rule, (0, 0)))
+            start = time.perf_counter()
+            await cog.run_bgolly(current, 'QuickLife', ca.ahead(gen, step), step, rule)
+            serial = await cog.do_gif(cog.execs, current, gen, step, {}, False, (54, 57, 62), False, 2)
+            t_serial = time.perf_counter() - start
+            start = time.perf_counter()
+            segmented = await cog.segmented_render(
+              cog.execs, current, 'QuickLife', gen, step, rule, {}, False, (54, 57, 62), False, 2
+            )
+            t_segmented = time.perf_counter() - start
+            if segmented is None:
+                ca.remove_quietly(f'{current}_out.rle')
+                print(f'{rule:>8} {size:>5} {gen:>5} {step:>4} {t_serial:>11.2f} {"too big to stitch":>14}')
+                continue
+            assert same(serial[3], segmented[3]), f'{rule} {size} differs'
+            print(f'{rule:>8} {size:>5} {gen:>5} {step:>4} {t_serial:>11.2f} {t_segmented:>14.2f} {t_serial / t_segmented:>7.1f}x')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
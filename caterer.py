@@ -1,3 +1,4 @@
+import asyncio
 import os
 import subprocess
 import zipfile
@@ -8,6 +9,7 @@ import discord
 from discord.ext import commands
 
 from cogs.meta import DOWNLOAD_LINK
+from cogs.resources.msgindex import MessageIndex
 
 
 def get_prefix(bot, message):
@@ -55,11 +57,26 @@ class Bot(commands.Bot):
         self.first_time = True
         self.owner = None
         self.assets_chn = None
+        # recent patterns/rules per channel, so cogs needn't dig through channel history for them
+        self.msgindex = MessageIndex()
+        # max number of bgolly/CAViewer processes any cog may run at once
+        self.proc_limit = asyncio.Semaphore(int(os.getenv('SIM_PROCESSES', os.cpu_count() or 1)))
         super().__init__(*args, **kwargs)
 
     async def on_message(self, message):
+        self.msgindex.add(message)
         await self.invoke(await self.custom_context(message))
 
+    async def on_raw_message_edit(self, payload):
+        if 'content' in payload.data:
+            self.msgindex.edit(payload.channel_id, payload.message_id, payload.data['content'])
+
+    async def on_raw_message_delete(self, payload):
+        self.msgindex.delete(payload.channel_id, [payload.message_id])
+
+    async def on_raw_bulk_message_delete(self, payload):
+        self.msgindex.delete(payload.channel_id, payload.message_ids)
+
     async def custom_context(self, message):
         return await self.get_context(message, cls=Context)
 
@@ -1,41 +1,48 @@
 import asyncio
 import concurrent
+import functools
+import gzip
 import io
 import json
 import marshal
 import math
-import operator
 import os
-import random
 import re
-import subprocess
+import shutil
 import time
 import types
-from collections import deque
+from collections import OrderedDict, deque
 from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from enum import Enum
 from itertools import count, islice, starmap
 
 import aiohttp
 import discord
-import imageio
 import numpy as np
 from PIL import ImageFile
 from discord.ext import commands
 
 ImageFile.LOAD_TRUNCATED_IMAGES = True
 
-from cogs.resources import mutils
+from cogs.resources import engines, gif, mutils, render, rle, sched, simcache
 
 
 class Log:
-    __slots__ = 'invoker', 'rule', 'time', 'status'
+    __slots__ = 'invoker', 'rule', 'time', 'status', 'job', 'algo', 'reason'
 
-    def __init__(self, invoker, rule, time, status):
+    def __init__(self, invoker, rule, time, status, job=None, algo=None, reason=None):
+        """algo, reason: What choose_algo() picked for the sim and why, if it was left to pick"""
         self.invoker = invoker
         self.rule = rule
         self.time = time
         self.status = status
+        self.job = job
+        self.algo = algo
+        self.reason = reason
+
+    def choose(self, algo, reason):
+        """Record what choose_algo() picked, as on_choice for CA.run_sim()"""
+        self.algo, self.reason = algo, reason
 
 
 class Status(Enum):
@@ -110,13 +117,6 @@ rXRLE = re.compile(
     re.I
 )
 
-# splits RLE into its runs
-rRUNS = re.compile(r'([0-9]*)([a-z][A-Z]|[ob.A-Z])')
-# [rRUNS.sub(lambda m: '10'[m[2] == 'b'] * int(m[1] or 1), pattern) for pattern in patlist[i]]
-
-# unrolls $ signs
-rDOLLARS = re.compile(r'(\d+)\$')
-
 # matches *.rule files
 rRULE = re.compile(
     r'@RULE ([A-Za-z0-9_]+)\n+[\s\S]*'
@@ -166,76 +166,694 @@ class Trackbox:
         )
 
 
-def _replace(m):
-    return '$' * int(m[1])
+def ahead(gen, step):
+    """
+    How far to have bgolly simulate a sim to gen: slightly past it, so that
+    its cached output still has every frame after two presses of ⏩.
+    """
+    return -(-gen // (4 * step)) * 4 * step
+
+
+def split_frames(n_frames, n_parts):
+    """
+    Cut frames 0 to n_frames - 1 into n_parts runs of consecutive frames,
+    as (first, stop) pairs. Every run starts on an even frame, so an even
+    generation: Golly runs B0 rules by swapping between two rules every
+    other generation, and a run started on an odd one would be out of step.
+    """
+    starts = sorted({n_frames * k // n_parts & ~1 for k in range(n_parts)})
+    return list(zip(starts, starts[1:] + [n_frames]))
+
+
+def open_output(current, cache=None):
+    """bgolly's output as a text file, either the real one or a gzipped copy from compress_output()"""
+    if cache is None:
+        return open(f'{current}_out.rle')
+    return gzip.open(io.BytesIO(cache), 'rt')
+
+
+def compress_output(current):
+    """
+    gzipped copy of bgolly's output to keep around for re-rendering,
+    or None if even that would take up more than CACHE_LIMIT bytes.
+    """
+    buf = io.BytesIO()
+    with open(f'{current}_out.rle', 'rb') as f, gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=1) as gz:
+        shutil.copyfileobj(f, gz)
+    return buf.getvalue() if buf.tell() <= CACHE_LIMIT else None
+
+
+class Packed(bytes):
+    """simulate()'s generations as pack_output() keeps them, in place of bgolly's output"""
+
+
+def pack_output(generations):
+    """
+    gzipped copy of simulate()'s generations to keep around for re-rendering,
+    the way compress_output() keeps bgolly's but without writing out RLE,
+    or None if even that would take up more than CACHE_LIMIT bytes.
+    """
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=1) as gz:
+        for pos, size, cells in generations:
+            if isinstance(cells, engines.Tiles):
+                record = pos, size, None, {key: tile.tobytes() for key, tile in cells.tiles.items()}
+            else:
+                record = pos, size, cells.shape, cells.tobytes()
+            marshal.dump(record, gz)
+            if buf.tell() > CACHE_LIMIT:
+                return None
+    return Packed(buf.getvalue()) if buf.tell() <= CACHE_LIMIT else None
+
+
+def _read_packed(cache):
+    with gzip.open(io.BytesIO(cache), 'rb') as f:
+        while True:
+            try:
+                pos, size, shape, cells = marshal.load(f)
+            except EOFError:
+                return
+            if shape is None:
+                tiles = {
+                  key: np.frombuffer(tile, np.uint8).reshape(engines.TILE, engines.TILE)
+                  for key, tile in cells.items()
+                }
+                yield pos, size, engines.Tiles(tiles)
+            else:
+                yield pos, size, np.frombuffer(cells, np.uint8).reshape(shape)
+
 
+def join_outputs(current, parts):
+    """Write the bgolly outputs of parts one after the other as current's, as if one bgolly had output them all"""
+    with open(f'{current}_out.rle', 'wb') as out:
+        for part in parts:
+            with open(f'{part}_out.rle', 'rb') as f:
+                shutil.copyfileobj(f, out)
+            out.write(b'\n')
 
-def parse(lines, current):
-    patlist = [x.strip("\n") for x in lines if re.match("\\S+", x)]
 
+def restart(current):
+    """Replace bgolly's output with its last generation as a pattern to run, {current}_in.rle"""
+    *_, last = _read_output(current, None)
+    with open(f'{current}_in.rle', 'w') as f:
+        f.write(checkpoint(last))
     os.remove(f'{current}_out.rle')
-    # `positions` needs to be a list, not a generator
-    # because it's returned from this function, so
-    # it gets pickled by run_in_executor -- and
-    # generators can't be pickled
-    # [(0, 0), (-1, 1), (0, 0), (-1, -1), (1, -2), (0, -1), (2, -2), (1, -1), (0, -2), (-1, 1)]
-    positions = list(map(lambda x: eval(x) if x != '-2147483648,-2147483648' else (0, 0), patlist[::3]))
-    # [(5, 3), (7, 1), (5, 3), (7, 5), (3, 7), (5, 5), (1, 7), (3, 5), (5, 7), (7, 1)]
-    bboxes = list(map(eval, patlist[1::3]))
 
-    # trackbox = Trackbox.from_lists(positions, bboxes)
 
+class SimCancelled(Exception):
+    """Raised in a parse/render worker once its sim has been cancelled"""
+
+
+def cancel_checker(current):
+    """
+    Function that raises SimCancelled once current's sim has been cancelled.
+    CA.run_cancellable() drops a file to tell workers to stop, and this only
+    looks for it every CANCEL_CHECK_INTERVAL seconds.
+    """
+    sentinel = f'{current}.cancel'
+    next_check = 0
+
+    def check():
+        nonlocal next_check
+        now = time.monotonic()
+        if now >= next_check:
+            if os.path.exists(sentinel):
+                raise SimCancelled
+            next_check = now + CANCEL_CHECK_INTERVAL
+    return check
+
+
+def _read_output(current, cache):
+    with open_output(current, cache) as f:
+        lines = filter(None, map(str.strip, f))
+        for line in lines:
+            if '@COLOR' in line:
+                return
+            # empty universes are positioned at (-2147483648, -2147483648)
+            pos = (0, 0) if line == '-2147483648,-2147483648' else tuple(map(int, line.split(',')))
+            size = tuple(map(int, next(lines).split(',')))
+            yield pos, size, next(lines)
+
+
+def _read_generations(current, cache):
+    check = cancel_checker(current)
+    if isinstance(cache, list):
+        # generations from simulate() are already in memory
+        generations = cache
+    elif isinstance(cache, Packed):
+        generations = _read_packed(cache)
+    else:
+        generations = _read_output(current, cache)
+    for generation in generations:
+        check()
+        yield generation
+
+
+def read_generations(current, cache=None, every=1, limit=None):
+    """
+    Lazily yield ((x, y), (width, height), cells) for every `every`th
+    generation in bgolly's output (or a cached copy of it), stopping at
+    its @COLORS section if any, or after `limit` of them. cells is RLE
+    text, or if cache is a list from simulate() or pack_output()'s copy of
+    one, already an array (or Tiles).
+    Only one generation is held in memory at a time.
+    """
+    return islice(_read_generations(current, cache), 0, None if limit is None else 1 + (limit - 1) * every, every)
+
+
+def read_colors(current, cache=None):
+    """Colors from the @COLORS section at the end of bgolly's output, as {token: rgb}"""
+    colors = {}
+    if isinstance(cache, (list, Packed)):
+        # bgolly only has colors to give for rule tables, which engines don't run
+        return colors
+    with open_output(current, cache) as f:
+        lines = filter(None, map(str.strip, f))
+        for line in lines:
+            if '@COLOR' in line:
+                break
+        for line in lines:
+            # '1    255 255 255   random comments' ->
+            # {'A': (255, 255, 255)}
+            state, rgb = line.split(None, 1)
+            if int(state):
+                colors[rle.token(int(state))] = tuple(map(int, rgb.split()[:3]))
+    return colors
+
+
+def parse(current, cache=None, every=1, limit=None):
+    """
+    First pass over bgolly's output: find the bounding box enclosing
+    every generation, without decoding any of them.
+    """
+    xmin = ymin = xmax = ymax = None
+    maxwidth = maxheight = 0
     # Determine the bounding box to make gifs from
     # The rectangle: xmin <= x <= xmax, ymin <= y <= ymax
     # where (x|y)(min|max) is the min/max coordinate across all gens.
-    xmins, ymins = zip(*positions)
-    (widths, heights), maxwidth, maxheight = zip(*bboxes), max(w for w, h in bboxes), max(h for w, h in bboxes)
-    xmaxes = starmap(operator.add, zip(xmins, widths))
-    ymaxes = starmap(operator.add, zip(ymins, heights))
-    xmin, ymin, xmax, ymax = min(xmins), min(ymins), max(xmaxes), max(ymaxes)
+    for (x, y), (width, height), _ in read_generations(current, cache, every, limit):
+        if xmin is None:
+            xmin, ymin, xmax, ymax = x, y, x + width, y + height
+        xmin, ymin = min(xmin, x), min(ymin, y)
+        xmax, ymax = max(xmax, x + width), max(ymax, y + height)
+        maxwidth, maxheight = max(maxwidth, width), max(maxheight, height)
     # Bounding box: top-left x and y, width and height
     bbox = xmin, ymin, xmax - xmin, ymax - ymin
-
-    # ['4b3$o', '3o2b'] -> ['4b$$$o', '3o2b']
-    # ['4b$$$o', '3o2b'] -> [['4b', '', '', '', 'o'], ['3o2b']]
-    return [i.replace('!', '').split('$') for i in
-            (rDOLLARS.sub(_replace, j) for j in patlist[2::3])], positions, bbox, (maxwidth, maxheight)
-
-
-def makeframes(current, gen, step, patlist, positions, bbox, pad, colors, bg, track, trackmaxes, grid):
+    return read_colors(current, cache), bbox, (maxwidth, maxheight)
+
+
+# Discord's upload limit is 8MB; leave some headroom for the request itself
+GIF_BUDGET = 7500000
+# Points in a sim sampled to estimate its GIF's size, and how much of GIF_BUDGET to aim for
+ESTIMATE_SAMPLES = 6
+ESTIMATE_MARGIN = 0.9
+# Max size of the gzipped bgolly output a sim keeps around so ⏩ can skip re-simulating
+CACHE_LIMIT = 32 * 1024 * 1024
+# Seconds between a worker's checks for whether its sim has been cancelled
+CANCEL_CHECK_INTERVAL = 0.1
+# Most cell updates, and cells kept across every frame, a sim may take before
+# it's handed over from its in-process engine to bgolly
+ENGINE_MAX_WORK = 20_000_000
+ENGINE_MAX_CELLS = 32 * 1024 * 1024
+# Most cells a Wolfram rule's spacetime diagram may have to be sent as one image
+SPACETIME_MAX_CELLS = 32 * 1024 * 1024
+# Generations the automatic QuickLife/HashLife choice watches a pattern for, and
+# the most cell updates it may take before giving up and going with QuickLife
+PROBE_GENS = 256
+PROBE_MAX_WORK = 8_000_000
+# Smallest step HashLife is picked for: below it, QuickLife is about as fast even on patterns HashLife suits
+HASHLIFE_MIN_STEP = 64
+# Fewest frames a process is given of a sim split between several (see CA.segmented_render())
+SEGMENT_MIN_FRAMES = 200
+
+
+def cell_size(width, height):
+    """Pixels a side to draw each cell of a width x height image with, so small ones aren't tiny"""
+    anchor = min(height, width)
+    return -(-100 // anchor) if anchor <= 100 else 1
+
+
+def simulate(current, infile, gen, step, rule):
+    """
+    In-process stand-in for bgolly: run the pattern in infile to gen with
+    one of engines' simulators, returning every step-th generation the way
+    read_generations() would yield them. Raises engines.Unsupported if bgolly
+    is better off doing it.
+    """
+    with open(infile) as f:
+        header, body = rle.split(f.read())
+    # a pattern's own rule wins, as with bgolly
+    engine = engines.find(header['rule'] or rule)
+    if engine is None:
+        raise engines.Unsupported
+    pos = header['pos'] or (0, 0)
+    return engines.run(
+        engine, pattern_cells(body, pos), pos, gen, step,
+        max_work=ENGINE_MAX_WORK, max_cells=ENGINE_MAX_CELLS, on_step=cancel_checker(current)
+    )
+
+
+def pattern_cells(body, pos):
+    """
+    An RLE body with its top left at pos, as engines.run() takes it. Raises
+    engines.TooBig if it's too big to step as one array but not spread out
+    enough for tiles (see engines.DENSE_MAX_AREA).
+    """
+    xs, ys, states = rle.coords(body)
+    area = (np.ptp(xs) + 1) * (np.ptp(ys) + 1) if xs.size else 0
+    if area > engines.TILED_MIN_AREA:
+        # too spread out to be worth decoding all the background in between
+        return engines.Tiles.from_cells(xs + pos[0], ys + pos[1], states)
+    if area > engines.DENSE_MAX_AREA:
+        raise engines.TooBig
+    return rle.decode(body)
+
+
+def find_period(history, max_period):
+    """
+    Smallest p up to max_period such that every column of history (a 2D
+    array, one row per generation) changes by the same amount every p
+    generations throughout, or None if there isn't one
+    """
+    for p in range(1, min(max_period, len(history) - 1) + 1):
+        diffs = history[p:] - history[:-p]
+        if (diffs == diffs[0]).all():
+            return p
+    return None
+
+
+def choose_algo(infile, rule, gen, step):
+    """
+    (algo, reason): whether QuickLife or HashLife should sim the pattern in
+    infile to gen with the given step, and why, for the sim log.
+
+    HashLife only pays off for long sims with big steps, and then only on
+    patterns that settle into something regular, like guns, spaceships and
+    oscillators. So a pattern up for one is run in-process for PROBE_GENS
+    generations, and gets HashLife if over the second half of them its
+    population and bounding box size are periodic, or grow by the same
+    amount every period. Chaotic patterns (soups, mostly) aren't, and are
+    left to QuickLife.
+    """
+    if gen < PROBE_GENS:
+        return 'QuickLife', f'under {PROBE_GENS} gens'
+    if step < HASHLIFE_MIN_STEP:
+        return 'QuickLife', f'step under {HASHLIFE_MIN_STEP}'
+    with open(infile) as f:
+        header, body = rle.split(f.read())
+    engine = engines.find(header['rule'] or rule)
+    if engine is None:
+        return 'QuickLife', 'rule not probed'
+    pos = header['pos'] or (0, 0)
+    try:
+        cells = pattern_cells(body, pos)
+    except engines.TooBig:
+        return 'QuickLife', 'too big to probe'
+    area = len(cells.tiles) * engines.TILE ** 2 if isinstance(cells, engines.Tiles) else cells.size
+    # not worth finding out the hard way
+    if area * PROBE_GENS > PROBE_MAX_WORK:
+        return 'QuickLife', 'too big to probe'
+    try:
+        probe = engines.run(
+            engine, cells, pos, PROBE_GENS, 1,
+            max_work=PROBE_MAX_WORK, max_cells=float('inf')
+        )
+    except engines.TooBig:
+        return 'QuickLife', 'too big to probe'
+    history = np.array([
+      (
+        sum(np.count_nonzero(tile) for tile in cells.tiles.values())
+        if isinstance(cells, engines.Tiles) else np.count_nonzero(cells),
+        *size
+      )
+      for _, size, cells in probe[PROBE_GENS // 2:]
+    ])
+    period = find_period(history, PROBE_GENS // 4)
+    if period is None:
+        return 'QuickLife', f'no period by gen {PROBE_GENS}'
+    return 'HashLife', f'period {period} by gen {PROBE_GENS}'
+
+
+def spacetime(text, rule, gen, colors, bg, grid):
+    """
+    A one-row pattern (full RLE text) under a Wolfram rule, run to gen and
+    drawn as a single PNG of its spacetime diagram, generation t as row t:
+    the last frame of the GIF bgolly's output would make, without the GIF.
+    Raises engines.Unsupported for anything else.
+    """
+    cells, file_rule, _ = rle.read(text)
+    engine = engines.find(file_rule or rule)
+    cells, _ = rle.crop(cells)
+    if not isinstance(engine, engines.Wolfram) or cells.shape[0] != 1:
+        raise engines.Unsupported
+    if (cells.shape[1] + 2 * gen) * (gen + 1) > SPACETIME_MAX_CELLS:
+        raise engines.TooBig
+    diagram = engine.spacetime(cells[0], gen)
+    # every generation keeps its row, even if it's empty
+    columns = np.flatnonzero(diagram.any(axis=0))
+    diagram = diagram[:, columns[0]:columns[-1] + 1]
+    height, width = diagram.shape
+    frame = np.zeros((2 + height, 2 + width), np.uint8)
+    frame[1:-1, 1:-1] = diagram
+    lut = rle.palette(colors, bg)
+    grid_index, n_colors = None, 2
+    if grid:
+        grid_index, n_colors = 2, 3
+        lut[grid_index] = 0, 0, 0
+    return render.to_png(render.upscale(frame, cell_size(width, height), grid_index), lut[:n_colors])
+
+
+def makeframes(
+  current, gen, step, bbox, pad, colors, bg, track, trackmaxes, grid, n_states,
+  limit, truncate=False, resume=None, cache=None, every=1
+):
+    """
+    Second pass over bgolly's output: decode, draw and encode each generation
+    as soon as it's read, so only one frame is ever in memory.
+
+    The GIF is built in memory and held under GIF_BUDGET. If it won't fit,
+    it's either cut off at the last frame that does (if truncate) or made
+    of only every nth frame. n is estimated up front from a few sample
+    frames, and if the GIF still overflows, re-chosen from how far that
+    attempt got.
+
+    If resume is given, it's the still-open GifWriter of an earlier render
+    that bgolly's output carries on from, and the new frames are appended to
+    it instead; bbox, trackmaxes etc. must be the ones it was rendered with.
+
+    Only the first `limit` generations are drawn; bgolly may have gone past
+    gen to fill the cache (see ahead()). If cache is given, generations are
+    read from it (see compress_output() and simulate()) instead of bgolly's
+    output, taking only every `every`th one.
+
+    Returns (GifWriter, cut, last): the writer is left open for resuming,
+    cut is None if nothing was cut, else ('truncated', frames kept) or
+    ('subsampled', n), and last is the final generation as yielded by
+    read_generations(), or None if the GIF doesn't end on it.
+    """
     xmin, ymin, width, height = bbox
     if track:
         width, height = trackmaxes
+    mul = cell_size(width, height)
     duration = min(1 / 6, max(1 / 60, 5 / gen / step) if gen else 1)
-    with imageio.get_writer(f'{current}.gif', mode='I', duration=str(duration)) as gif_writer:
-        for pat, (xpos, ypos) in zip(patlist, positions):
-            dx, dy = (1, 1) if track else (1 + (xpos - xmin), 1 + (ypos - ymin))
-            frame = [[bg] * (2 + width) for _ in range(2 + height)]
-
-            # Draw the pattern onto the frame by replacing segments of background rows
-            for i, flat_row in enumerate(
-                    [
-                        bg if char in '.b' else colors[char]
-                        for run, char in rRUNS.findall(row)
-                        for _ in range(int(run or 1))
-                    ]
-                    for row in pat
-            ):
-                frame[dy + i][dx:dx + len(flat_row)] = flat_row
-            anchor = min(height, width)
-            mul = -(-100 // anchor) if anchor <= 100 else 1
-            first_grid = 0 if grid else None
-            gif_writer.append_data(
-                np.asarray(
-                    mutils.scale(
-                        (mutils.scale(row, mul, grid=first_grid) for row in frame),
-                        mul, grid=(0, 0, 0) if grid else None
-                    ),
-                    np.uint8
-                ))
-            if os.stat(f'{current}.gif').st_size > 7500000:
-                return True
-    return False
+
+    # Frames are drawn in state indices, which double as indices into one global palette,
+    # which always has room for live cells (C0 Larger than Life rules come through as 0 states)
+    n_states = max(n_states, 2)
+    lut = rle.palette(colors, bg)
+    n_colors = n_states
+    grid_index = None
+    if grid:
+        if n_states < 256:
+            grid_index, n_colors = n_states, n_states + 1
+            lut[grid_index] = 0, 0, 0
+        else:
+            # no room for another color, so draw the grid with whichever live state's darkest
+            grid_index = 1 + int(lut[1:].astype(int).sum(axis=1).argmin())
+
+    def draw(xpos, ypos, body):
+        dx, dy = (1, 1) if track else (1 + (xpos - xmin), 1 + (ypos - ymin))
+        frame = np.zeros((2 + height, 2 + width), np.uint8)
+
+        # Draw the pattern onto the frame's background
+        if isinstance(body, engines.Tiles):
+            body.paint(frame, xpos - dx, ypos - dy)
+            return render.upscale(frame, mul, grid_index)
+        # '1b1o1$2b1o1$3o1!' -> [[0, 1, 0], [0, 0, 1], [1, 1, 1]]
+        cells = (rle.decode(body) if isinstance(body, str) else body)[:frame.shape[0] - dy, :frame.shape[1] - dx]
+        frame[dy:dy + cells.shape[0], dx:dx + cells.shape[1]] = cells
+        return render.upscale(frame, mul, grid_index)
+
+    def estimate_stride(n_gens):
+        """
+        Smallest n such that a GIF of every nth generation should fit
+        GIF_BUDGET, estimated by really encoding a few sample frames.
+        """
+        # Nothing could possibly be over: every frame at worst ~12 bits per pixel
+        if n_gens * (2 + width) * (2 + height) * mul * mul * 3 // 2 < GIF_BUDGET:
+            return 1
+        # Sample the cost of a frame drawn over the one d generations before it at a few
+        # evenly-spaced points, for d = 1, 2, 4...; anything in between is interpolated
+        gaps = [1 << k for k in range((n_gens - 1).bit_length())] or [1]
+        anchors = range(0, n_gens, -(-n_gens // ESTIMATE_SAMPLES))
+        wanted = {a + d for a in anchors for d in gaps if a + d < n_gens} | set(anchors)
+        frames = {
+          i: draw(xpos, ypos, body)
+          for i, ((xpos, ypos), _, body) in enumerate(islice(read_generations(current, cache, every, limit), max(wanted) + 1))
+          if i in wanted
+        }
+        first = gif.frame_size(None, frames[0])
+        costs = []
+        for d in gaps:
+            sizes = [gif.frame_size(frames[a], frames[a + d]) for a in anchors if a + d < n_gens]
+            costs.append(sum(sizes) / len(sizes) if sizes else costs[-1])
+
+        def estimate(stride):
+            k = max(0, stride.bit_length() - 1)
+            lo, hi = gaps[min(k, len(gaps) - 1)], gaps[min(k + 1, len(gaps) - 1)]
+            cost = costs[min(k, len(costs) - 1)]
+            if hi > lo:
+                cost += (costs[min(k + 1, len(costs) - 1)] - cost) * (stride - lo) / (hi - lo)
+            return first + (-(-n_gens // stride) - 1) * cost
+
+        target = ESTIMATE_MARGIN * GIF_BUDGET
+        return next((stride for stride in range(1, n_gens) if estimate(stride) <= target), n_gens)
+
+    def encode(stride, gif_writer=None, skip=0):
+        """
+        Append every stride-th generation after the first `skip` to gif_writer
+        (or a new one), returning the writer, how many frames were read before
+        it filled up (None if it didn't) and the last generation read.
+        """
+        if gif_writer is None:
+            gif_writer = gif.GifWriter(
+              io.BytesIO(), ((2 + width) * mul, (2 + height) * mul), lut[:n_colors], duration, budget=GIF_BUDGET
+            )
+        last = None
+        for i, generation in enumerate(islice(read_generations(current, cache, every, limit), skip, None, stride)):
+            (xpos, ypos), _, body = last = generation
+            gif_writer.append(draw(xpos, ypos, body))
+            if gif_writer.full:
+                return gif_writer, i, None
+        # the writer holds the last frame back in case it repeats, so make sure it fits too
+        gif_writer.flush()
+        if gif_writer.full:
+            return gif_writer, i, None
+        return gif_writer, None, last
+
+    try:
+        if resume is not None:
+            # bgolly's first generation here is the one resume's GIF already ends on
+            gif_writer, n_read, last = encode(1, resume, 1)
+            return gif_writer, None if n_read is None else ('truncated', gif_writer.n_kept), last
+        n_gens = limit
+        # Render once at the right stride rather than finding out the hard way
+        stride = 1 if truncate else estimate_stride(n_gens)
+        while True:
+            gif_writer, n_read, last = encode(stride)
+            if n_read is None and stride == 1:
+                return gif_writer, None, last
+            if n_read is None:
+                # the frames ➕ would add can't go on every stride-th, so there's nothing to resume
+                return gif_writer, ('subsampled', stride), None
+            if truncate or stride >= n_gens:
+                return gif_writer, ('truncated', gif_writer.n_kept), None
+            # later frames tend to cost more than earlier ones, so always go up by at least one
+            stride = max(stride + 1, -(-n_gens // max(1, n_read)))
+    finally:
+        if cache is None:
+            os.remove(f'{current}_out.rle')
+
+
+def simulate_gif(
+  current, infile, sim_gen, rule, gen, step, n_frames, colors, bg, track, grid, n_states, truncate, resume=None
+):
+    """
+    simulate() to sim_gen, then parse() and makeframes() the generations in
+    the same worker, so that they're drawn straight from memory instead of
+    every one of them being pickled back to the bot and out again. If resume
+    is given, it's a Session whose GIF they carry on.
+
+    Returns (seconds taken to simulate and parse, bbox, trackmaxes,
+    makeframes()'s result, pack_output()'s copy of the generations or None
+    if resuming), or None if they go outside resume's frames.
+    """
+    start = time.perf_counter()
+    output = simulate(current, infile, sim_gen, step, rule)
+    # engines don't run rule tables, so there are no colors to read
+    _, bbox, trackmaxes = parse(current, output, 1, n_frames)
+    t_parse = time.perf_counter() - start
+    if resume is not None:
+        if not resume.fits(bbox, trackmaxes, track):
+            return None
+        bbox, trackmaxes = resume.bbox, resume.trackmaxes
+    rendered = makeframes(
+        current, gen, step, bbox, len(str(gen)), colors, bg, track, trackmaxes,
+        grid, n_states, n_frames, truncate, resume and resume.writer, output
+    )
+    return t_parse, bbox, trackmaxes, rendered, None if resume is not None else pack_output(output)
+
+
+def cut_note(cut):
+    """Line to append to a sim's message saying how makeframes() cut its GIF down, if it did"""
+    if cut is None:
+        return ''
+    how, n = cut
+    if how == 'truncated':
+        return f'\n(Truncated after {n} frames to fit under 8MB)'
+    return f'\n(Showing 1 in every {n} frames to fit under 8MB)'
+
+
+class Cache:
+    """
+    A sim's whole output from compress_output() (or pack_output(), if it was
+    simulated in-process), and the step and generation it was run with/to
+    """
+    __slots__ = 'data', 'step', 'gen'
+
+    def __init__(self, data, step, gen):
+        self.data = data
+        self.step = step
+        self.gen = gen
+
+    def covers(self, gen, step):
+        """Whether every frame of a sim to gen with this step is in here"""
+        return not step % self.step and -(-gen // step) * step <= self.gen
+
+
+class Session:
+    """
+    A finished render that ➕ can pick back up from: its still-open GifWriter,
+    the geometry its frames were drawn with, and its last generation (None if
+    the GIF was cut short or subsampled). Also holds on to the sim's cached
+    output, if any, for ⏩.
+    """
+    __slots__ = 'gen', 'bbox', 'trackmaxes', 'writer', 'last', 'cache'
+
+    def __init__(self, gen, bbox, trackmaxes, writer, last, cache=None):
+        self.gen = gen
+        self.bbox = bbox
+        self.trackmaxes = trackmaxes
+        self.writer = writer
+        self.last = last
+        self.cache = cache
+
+    def fits(self, bbox, trackmaxes, track):
+        """Whether generations with the given bounds can be drawn onto this render's frames"""
+        if track:
+            return all(new <= old for new, old in zip(trackmaxes, self.trackmaxes))
+        x, y, width, height = bbox
+        xmin, ymin, maxwidth, maxheight = self.bbox
+        return xmin <= x and ymin <= y and x + width <= xmin + maxwidth and y + height <= ymin + maxheight
+
+    def checkpoint(self, rule=None):
+        """The last generation as RLE, in its place in the universe, for bgolly to carry on from"""
+        return checkpoint(self.last, rule)
+
+
+def checkpoint(generation, rule=None):
+    """A generation as yielded by read_generations() as RLE, in its place in the universe"""
+    (x, y), (width, height), body = generation
+    if isinstance(body, engines.Tiles):
+        body, _ = body.to_array()
+    if not isinstance(body, str):
+        body = rle.encode(body)
+    return f'#CXRLE Pos={x},{y}\nx = {width}, y = {height}' + (f', rule = {rule}' if rule else '') + f'\n{body}\n'
+
+
+def classify(rule, algo='QuickLife'):
+    """
+    (algo, n_states) to sim rule with, given the algo asked for in flags.
+    Doesn't handle `rulestring::generator` rules. A RuleLoader rule's
+    n_states is only known once its rule file is fetched, so is left at 2.
+    """
+    n_states = 2
+    if rLtL.match(rule):
+        algo = 'Larger than Life'
+        # C0 means two states, same as C2
+        n_states = max(int(rLtL.match(rule)[1]), 2)
+    elif not rRULESTRING.fullmatch(rule) and rCAVIEWER.fullmatch(rule):
+        algo = 'CAViewer'
+    elif not rRULESTRING.fullmatch(rule) and algo != 'CAViewer':
+        algo = 'RuleLoader'
+    if rule.count('/') > 1 and algo != 'CAViewer':
+        algo = 'Generations'
+        n_states = int(rule.split('/')[-1].rstrip('HVhv'))
+    return algo, n_states
+
+
+def precheck(pat, n_states):
+    """
+    The CPU-bound part of getting a pattern ready to sim: (error, normalized),
+    where error is why rle.validate() rejected it (or None) and normalized is
+    its rle.normalize()d form for the sim cache's key (None if invalid).
+    """
+    try:
+        rle.validate(pat, n_states)
+    except ValueError as e:
+        return str(e), None
+    return None, rle.normalize(pat)
+
+
+class Precheck:
+    """
+    What prevalidation found out about a posted pattern ahead of a !sim for
+    it: classify()'s verdict (for the QuickLife default), the rule file if
+    RuleLoader had to fetch one, and precheck()'s result.
+    """
+    __slots__ = 'algo', 'n_states', 'rule_info', 'error', 'normalized'
+
+    def __init__(self, algo, n_states, rule_info, error, normalized):
+        self.algo = algo
+        self.n_states = n_states
+        self.rule_info = rule_info
+        self.error = error
+        self.normalized = normalized
+
+
+class Prechecks:
+    """Bounded per-channel store of in-progress or finished prevalidations, keyed by (pat, rule)"""
+    def __init__(self, per_channel=4, max_channels=256):
+        self.per_channel = per_channel
+        self.max_channels = max_channels
+        self._channels = OrderedDict()
+
+    def add(self, channel_id, pat, rule, task):
+        """Remember task, an asyncio.Task resolving to a Precheck or None"""
+        entries = self._channels.pop(channel_id, None) or OrderedDict()
+        self._channels[channel_id] = entries
+        entries[pat, rule] = task
+        while len(entries) > self.per_channel:
+            _, old = entries.popitem(last=False)
+            old.cancel()
+        while len(self._channels) > self.max_channels:
+            _, forgotten = self._channels.popitem(last=False)
+            for old in forgotten.values():
+                old.cancel()
+
+    async def get(self, channel_id, pat, rule):
+        """The Precheck for pat in rule, waiting on it if it's still being worked out, or None"""
+        task = self._channels.get(channel_id, {}).get((pat, rule))
+        if task is None:
+            return None
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+        except Exception:
+            pass
+        # it's only ever a head start, so just do things the slow way
+        return None
+
+
+def remove_quietly(*paths):
+    """Delete files that may or may not still exist"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
 
 
 def genconvert(gen: int):
@@ -258,37 +876,41 @@ class CA(commands.Cog):
         self.rulecache = None
         self.gencache = None
         self.session = aiohttp.ClientSession()
-
-    @staticmethod
-    def state_from(val, n_states):
-        if n_states < 3:
-            return 'bo'[val] if isinstance(val, int) else int(val == 'o')
-        return mutils.state_from(val)
-
-    def get_rand_state(self, n_states: int, last_state: str, allowed_states: {int}) -> str:
-        if last_state is None:
-            return self.state_from(random.randrange(0, n_states), n_states)
-        new = last_state = self.state_from(last_state, n_states)
-        while new == last_state or new not in allowed_states:
-            new = random.randrange(0, n_states)
-        return self.state_from(new, n_states)
+        # shared with every other cog that runs bgolly/CAViewer
+        self.proc_limit = bot.proc_limit
+        # max number of processes one long sim is split between
+        self.segments = int(os.getenv('SIM_SEGMENTS', os.cpu_count() or 1))
+        self.scheduler = sched.Scheduler(
+            int(os.getenv('SIM_SLOTS', os.cpu_count() or 1)),
+            int(os.getenv('SIM_QUEUE', 16))
+        )
+        self.flights = sched.Flights()
+        self.simcache = simcache.SimCache(
+            os.getenv('SIM_CACHE_DIR', f'{self.dir}/simcache'),
+            int(os.getenv('SIM_CACHE_BYTES', 256 * 1024 * 1024))
+        )
+        # opt-in: prevalidate patterns as they're posted, if nothing's simming
+        self.prevalidate = bool(int(os.getenv('SIM_PREVALIDATE', 0)))
+        self.prechecks = Prechecks()
+        self.bot.msgindex.track('xrle', rXRLE.search)
+        self.bot.msgindex.track('rulestring', lambda content: rLtL.search(content) or rRULESTRING.search(content))
+        self.bot.msgindex.track('ruletable', rRULE.search)
 
     def makesoup(self, rulestring: str, n_states: int, x: int, y: int, allowed_states: {int}) -> str:
         """Generates random soup as RLE with specified dimensions"""
-        rle = f'x = {x}, y = {y}, rule = {rulestring}\n'
-        last_state = None
-        for row in range(y):
-            pos = x
-            while pos > 0:
-                # below could also just be random.randint(1,x) but something likes this gives natural-ish-looking results
-                runlength = math.ceil(-math.log(1 - random.random()))
-                if runlength > pos:
-                    runlength = pos  # or just `break`, no big difference qualitatively
-                last_state = self.get_rand_state(n_states, last_state, allowed_states)
-                rle += (str(runlength) if runlength > 1 else '') + last_state
-                pos -= runlength
-            rle += '$\n' if y > row + 1 else '!\n'
-        return rle
+        allowed = np.array(sorted(allowed_states), np.uint8)
+        # Each cell starts a new run with probability 1 - 1/e, which gives the same
+        # natural-ish-looking run lengths as ceil(-log(1 - random())); rows always start a new run
+        starts = np.random.random((y, x)) < 1 - math.exp(-1)
+        starts[:, 0] = True
+        run_of = np.cumsum(starts.ravel()) - 1
+        # Every run takes an allowed state different from the run before it
+        n_runs = 1 + int(run_of[-1])
+        shifts = np.random.randint(1, len(allowed), n_runs)
+        shifts[0] = np.random.randint(len(allowed))
+        states = allowed[np.cumsum(shifts) % len(allowed)]
+        cells = states[run_of].reshape(y, x)
+        return f'x = {x}, y = {y}, rule = {rulestring}\n' + rle.encode(cells, n_states < 3)
 
     @staticmethod
     def _extend(n, *, thresh=50):
@@ -306,67 +928,383 @@ class CA(commands.Cog):
             return correct_emoji and (rxn.count > 3 or usr.id == WRIGHT)
         return correct_emoji
 
-    async def do_gif(self, execs, current, gen, step, colors, track, bg, grid):
-        # Getting colors
-        lines = []
-        in_colors = False
-        with open(f"{current}_out.rle", "r") as file:
-            for line in file.readlines():
-                line = line.rstrip('\n')
-                if "@COLOR" in line:
-                    in_colors = True
-                    continue
-                if in_colors:
-                    # '0    255 255 255   random comments' ->
-                    # {0: (255, 255, 255)}
-                    state, rgb = line.split(None, 1)
-
-                    if state == 0:
-                        colors['.'] = tuple(map(int, rgb.split()[:3]))
-                        colors['b'] = tuple(map(int, rgb.split()[:3]))
-                    elif state == 1:
-                        colors['A'] = tuple(map(int, rgb.split()[:3]))
-                        colors['o'] = tuple(map(int, rgb.split()[:3]))
-                    else:
-                        colors[chr(int(state) + 64)] = tuple(map(int, rgb.split()[:3]))
-                else:
-                    lines.append(line)
-
+    async def do_gif(
+      self, execs, current, gen, step, colors, track, bg, grid, n_states,
+      truncate=False, session=None, reuse=False, sim=None
+    ):
+        """
+        Render bgolly's output to a GIF, or if sim is given as (infile,
+        gen, rule), simulate that in-process and render it in one go (see
+        simulate_gif()); raises engines.Unsupported if it can't be.
+
+        If reuse, session's cached output is re-rendered at the new step
+        instead, and bgolly needn't have been run at all. Otherwise, if session
+        is given, the output carries on from it and is appended to its GIF;
+        returns None if that can't be done (the new generations go outside its
+        frames, or overflow its GIF) so that the caller can start over.
+        """
         start = time.perf_counter()
-        patlist, positions, bbox, trackmaxes = await self.loop.run_in_executor(
-            execs[0][0], parse,
-            lines, current
+        cache, every = (session.cache.data, step // session.cache.step) if reuse else (None, 1)
+        resume = None if reuse else session
+        # Frames run from generation base to the first multiple of step at or past gen
+        base = resume.gen if resume is not None else 0
+        n_frames = 1 + -(-(gen - base) // step)
+        if sim is not None:
+            result = await self.run_cancellable(
+                execs[0][0], current, simulate_gif,
+                current, *sim, gen, step, n_frames, colors, bg, track, grid, n_states, truncate,
+                # (its cache needn't go along)
+                resume and Session(resume.gen, resume.bbox, resume.trackmaxes, resume.writer, None)
+            )
+            if result is None:
+                return None
+            t_parse, bbox, trackmaxes, (gif_writer, oversized, last), data = result
+            end_parse, end_makeframes = start + t_parse, time.perf_counter()
+            if resume is not None and oversized:
+                return None
+            sim_cache = session.cache if session is not None else data and Cache(data, step, sim[1])
+            session = Session(base + (n_frames - 1) * step, bbox, trackmaxes, gif_writer, last, sim_cache)
+            return start, end_parse, end_makeframes, gif_writer.getvalue(), oversized, session
+        file_colors, bbox, trackmaxes = await self.run_cancellable(
+            execs[0][0], current, parse,
+            current, cache, every, n_frames
         )
+        colors.update(file_colors)
+        n_states = max(n_states, 2, 1 + max(map(rle.STATES.get, file_colors), default=0))
+        if session is None:
+            # keep every generation around (before makeframes() is done with bgolly's output) for ⏩
+            data = await self.run_cancellable(execs[0][0], current, compress_output, current)
+            sim_cache = None if data is None else Cache(data, step, ahead(gen, step))
+        else:
+            sim_cache = session.cache
         end_parse = time.perf_counter()
-        oversized = await self.loop.run_in_executor(
-            execs[1][0], makeframes,
-            current, gen, step, patlist, positions, bbox,
+        if resume is not None:
+            if not resume.fits(bbox, trackmaxes, track):
+                remove_quietly(f'{current}_out.rle')
+                return None
+            bbox, trackmaxes = resume.bbox, resume.trackmaxes
+        gif_writer, oversized, last = await self.run_cancellable(
+            execs[1][0], current, makeframes,
+            current, gen, step, bbox,
             len(str(gen)), colors, bg, track, trackmaxes,
-            grid
+            grid, n_states, n_frames, truncate, resume and resume.writer, cache, every
         )
         end_makeframes = time.perf_counter()
-        return start, end_parse, end_makeframes, oversized
+        if resume is not None and oversized:
+            return None
+        session = Session(base + (n_frames - 1) * step, bbox, trackmaxes, gif_writer, last, sim_cache)
+        return start, end_parse, end_makeframes, gif_writer.getvalue(), oversized, session
 
-    async def run_bgolly(self, current, algo, gen, step, rule):
+    async def run_cancellable(self, executor, current, func, *args):
+        """
+        loop.run_in_executor(), except that if this is cancelled while func is
+        already running, func is told to stop at its next frame boundary
+        (see _read_generations()) instead of being left to finish, and the
+        sim's bgolly output is deleted once it has.
+        """
+        future = executor.submit(func, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if future.cancel():
+                # never got started
+                remove_quietly(f'{current}_out.rle')
+            else:
+                sentinel = f'{current}.cancel'
+                open(sentinel, 'w').close()
+                future.add_done_callback(lambda _: remove_quietly(sentinel, f'{current}_out.rle'))
+            raise
+
+    async def first_render(
+      self, flight, cache_key, current, in_rle, algo, gen, step, rule,
+      execs, colors, track, bg, grid, n_states, truncate, choose=False
+    ):
+        """
+        Queue, simulate and render a sim for everyone waiting on flight, and
+        cache the result. Returns do_gif()'s result, or bgolly's error message.
+        If choose, QuickLife or HashLife is picked for it (see pick_algo()),
+        and the choice kept as flight.choice and on everyone's logs.
+        """
+        def on_choice(algo, reason):
+            flight.choice = algo, reason
+            for log in flight.logs:
+                log.choose(algo, reason)
+
+        async with self.scheduler.turn(flight.job, on_move=flight.on_move):
+            for log in flight.logs:
+                log.status = Status.SIMMING
+            with open(f'{current}_in.rle', 'w') as infile:
+                infile.write(in_rle)
+            result = None
+            try:
+                try:
+                    result = await self.run_engine(
+                        execs, current, algo, gen, step, rule, colors, track, bg, grid, n_states, truncate
+                    )
+                except engines.Unsupported:
+                    # bgolly it is
+                    if choose:
+                        algo = await self.pick_algo(execs, current, gen, step, rule, on_choice)
+                    if self.n_segments(algo, gen, step) > 1:
+                        result = await self.segmented_render(
+                            execs, current, algo, gen, step, rule, colors, track, bg, grid, n_states
+                        )
+                        bg_err = result if isinstance(result, str) else ''
+                    else:
+                        bg_err = await self.run_bgolly(current, algo, ahead(gen, step), step, rule)
+                else:
+                    bg_err = ''
+            finally:
+                # (everyone waiting on this writes their own afterward)
+                os.remove(f'{current}_in.rle')
+            if bg_err:
+                remove_quietly(f'{current}_out.rle')
+                return bg_err
+            if result is None:
+                result = await self.do_gif(execs, current, gen, step, colors, track, bg, grid, n_states, truncate)
+        if cache_key is not None:
+            await self.loop.run_in_executor(
+                None, functools.partial(self.simcache.put, cache_key, result[3], cut=result[4])
+            )
+        return result
+
+    async def rerender(
+      self, how, session, execs, current, in_rle, algo, gen, step, rule,
+      colors, track, bg, grid, n_states, truncate, on_choice=None
+    ):
+        """
+        Simulate and render a sim again after ➕ or ⏩ (how) was pressed on
+        session's GIF, reusing as much of it as can be. Returns do_gif()'s
+        result, or bgolly's error message. on_choice is as for run_sim().
+        """
+        if how == '⏩' and session is not None and session.cache is not None and session.cache.covers(gen, step):
+            # every frame needed has already been simulated
+            return await self.do_gif(
+                execs, current, gen, step, colors, track, bg, grid, n_states, truncate, session, reuse=True
+            )
+        if how == '➕' and session is not None and session.last is not None and algo != 'CAViewer' and gen > session.gen:
+            # Simulate and render only the new generations, carrying on from the last frame
+            with open(f'{current}_resume.rle', 'w') as resumefile:
+                resumefile.write(session.checkpoint(rle.split(in_rle)[0]['rule']))
+            try:
+                result = await self.run_sim(
+                    execs, current, algo, gen, step, rule, colors, track, bg, grid, n_states, truncate,
+                    session, f'{current}_resume.rle', on_choice
+                )
+            finally:
+                os.remove(f'{current}_resume.rle')
+            if result is not None:
+                return result
+        # nothing cached or to resume from, or the new generations wouldn't fit it
+        return await self.run_sim(
+            execs, current, algo, gen, step, rule, colors, track, bg, grid, n_states, truncate, on_choice=on_choice
+        )
+
+    async def url_alive(self, url):
+        """Whether something's still at url, e.g. an old attachment that might have been deleted"""
+        try:
+            async with self.session.head(url) as resp:
+                return resp.status == 200
+        except aiohttp.ClientError:
+            return False
+
+    async def run_sim(
+      self, execs, current, algo, gen, step, rule, colors, track, bg, grid, n_states, truncate,
+      session=None, infile=None, on_choice=None
+    ):
+        """
+        run_bgolly() then do_gif(), except that rules engines can handle are
+        simulated in-process if they're small enough (see run_engine()).
+        Returns do_gif()'s result, or bgolly's error message. If session is
+        given, infile carries on from it, as for do_gif(). If on_choice is
+        given, QuickLife or HashLife is picked for bgolly with pick_algo().
+        """
+        try:
+            return await self.run_engine(
+                execs, current, algo, gen, step, rule, colors, track, bg, grid, n_states, truncate, session, infile
+            )
+        except engines.Unsupported:
+            pass
+        # bgolly runs on past gen for the cache (see ahead()), unless there's an earlier GIF to carry on
+        sim_gen = gen - session.gen if session is not None else ahead(gen, step)
+        if on_choice is not None:
+            algo = await self.pick_algo(execs, current, sim_gen, step, rule, on_choice, infile)
+        bg_err = await self.run_bgolly(current, algo, sim_gen, step, rule, infile)
+        if bg_err:
+            remove_quietly(f'{current}_out.rle')
+            return bg_err
+        return await self.do_gif(execs, current, gen, step, colors, track, bg, grid, n_states, truncate, session)
+
+    async def pick_algo(self, execs, current, gen, step, rule, on_choice, infile=None):
+        """
+        QuickLife or HashLife for a sim bgolly's about to run, from choose_algo().
+        Calls on_choice(algo, reason) with it before returning it.
+        """
+        algo, reason = await self.run_cancellable(
+            execs[0][0], current, choose_algo,
+            infile or f'{current}_in.rle', rule, gen, step
+        )
+        on_choice(algo, reason)
+        return algo
+
+    async def run_engine(
+      self, execs, current, algo, gen, step, rule, colors, track, bg, grid, n_states, truncate,
+      session=None, infile=None
+    ):
+        """
+        do_gif()'s result for a sim simulated in-process (see simulate()) and
+        rendered by the same worker, with session and infile as for run_sim().
+        Raises engines.Unsupported if it's not one engines can handle or it's
+        too big for them.
+        """
+        if algo not in ('QuickLife', 'HashLife', 'Generations', 'Larger than Life') or engines.find(rule) is None:
+            raise engines.Unsupported
+        sim_gen = gen - session.gen if session is not None else ahead(gen, step)
+        return await self.do_gif(
+            execs, current, gen, step, colors, track, bg, grid, n_states, truncate, session,
+            sim=(infile or f'{current}_in.rle', sim_gen, rule)
+        )
+
+    def n_segments(self, algo, gen, step):
+        """How many processes to split a sim to gen between (see segmented_render())"""
+        if algo not in ('QuickLife', 'HashLife'):
+            return 1
+        return min(self.segments, (1 + -(-gen // step)) // SEGMENT_MIN_FRAMES)
+
+    async def run_segment(self, execs, part, infile, algo, start, gen, step, rule):
+        """
+        run_bgolly() on one segment of a sim, from generation start of the
+        pattern in infile to gen generations later. HashLife skips ahead
+        to start first, so no segment waits on the ones before it.
+        """
+        if start:
+            err = await self.run_bgolly(part, 'HashLife', start, start, rule, infile)
+            if err:
+                return err
+            await self.run_cancellable(execs[0][0], part, restart, part)
+            infile = f'{part}_in.rle'
+        return await self.run_bgolly(part, algo, gen, step, rule, infile)
+
+    async def segmented_render(
+      self, execs, current, algo, gen, step, rule, colors, track, bg, grid, n_states
+    ):
+        """
+        Simulate and render a long sim bgolly has to run in segments at once,
+        one per process, instead of as a single run: its frames are cut into
+        n_segments() runs, every run's bgolly starts from where HashLife puts
+        the pattern at the run's first frame, and every run's GIF is rendered
+        against the whole sim's bounding box and appended to the one before's
+        (see GifWriter.extend()).
+
+        Returns do_gif()'s result, or bgolly's error message. Stitched GIFs
+        can't be cut down to fit GIF_BUDGET, so if this one would have to be,
+        returns None instead with {current}_out.rle holding the whole sim
+        for do_gif() to render the usual way; runs still rendering by then
+        are cancelled rather than waited on.
+        """
+        start = time.perf_counter()
+        n_frames = 1 + -(-gen // step)
+        runs = split_frames(n_frames, self.n_segments(algo, gen, step))
+        parts = [f'{current}_{k}' for k in range(len(runs))]
+        try:
+            errors = await asyncio.gather(*(
+              self.run_segment(
+                  execs, part, f'{current}_in.rle', algo, first * step,
+                  # the last one runs on past gen, for the cache (see ahead())
+                  (stop - 1 - first) * step if stop < n_frames else ahead(gen, step) - first * step,
+                  step, rule
+              )
+              for part, (first, stop) in zip(parts, runs)
+            ))
+            if any(errors):
+                return next(filter(None, errors))
+            parsed = await asyncio.gather(*(
+              self.run_cancellable(execs[0][0], part, parse, part, None, 1, stop - first)
+              for part, (first, stop) in zip(parts, runs)
+            ))
+            await self.run_cancellable(execs[0][0], current, join_outputs, current, parts)
+            data = await self.run_cancellable(execs[0][0], current, compress_output, current)
+            sim_cache = None if data is None else Cache(data, step, ahead(gen, step))
+            xmin = min(x for _, (x, _, _, _), _ in parsed)
+            ymin = min(y for _, (_, y, _, _), _ in parsed)
+            bbox = (
+              xmin, ymin,
+              max(x + width for _, (x, _, width, _), _ in parsed) - xmin,
+              max(y + height for _, (_, y, _, height), _ in parsed) - ymin
+            )
+            trackmaxes = tuple(map(max, zip(*(maxes for _, _, maxes in parsed))))
+            end_parse = time.perf_counter()
+            renders = [
+              asyncio.ensure_future(self.run_cancellable(
+                  execs[1][0], part, makeframes,
+                  part, gen, step, bbox,
+                  len(str(gen)), colors, bg, track, trackmaxes,
+                  grid, n_states, stop - first, True
+              ))
+              for part, (first, stop) in zip(parts, runs)
+            ]
+            try:
+                # stitched on in order as they're done, till one doesn't fit
+                gif_writer, cut, last = await renders[0]
+                for task in renders[1:]:
+                    if cut:
+                        break
+                    writer, cut, last = await task
+                    cut = cut or not gif_writer.extend(writer)
+            finally:
+                # any still rendering once the GIF's full would only be thrown away
+                for task in renders:
+                    task.cancel()
+                await asyncio.gather(*renders, return_exceptions=True)
+            end_makeframes = time.perf_counter()
+        finally:
+            remove_quietly(*(f'{part}_{suffix}.rle' for part in parts for suffix in ('in', 'out')))
+        if cut:
+            return None
+        remove_quietly(f'{current}_out.rle')
+        session = Session((n_frames - 1) * step, bbox, trackmaxes, gif_writer, last, sim_cache)
+        return start, end_parse, end_makeframes, gif_writer.getvalue(), None, session
+
+    async def run_bgolly(self, current, algo, gen, step, rule, infile=None):
         # max_mem = int(os.popen('free -m').read().split()[7]) // 1.25 TODO: use
         timeout = 5 * 60
         preface = f'{self.dir}/resources/bgolly'
         if '::' in rule:
             rule = f"{rule}_{current.split('/')[-1]}"
         algo = algo.split('::')[0]
-        ruleflag = f's {self.dir}/' if algo == 'RuleLoader' else f'r {rule}'
-        if algo == "CAViewer":
-            preface = f'{self.dir}/resources/bin/CAViewer'
-
-            p = subprocess.Popen(
-                f"timeout {timeout} {preface} sim -g {gen} -s {step} -i {current}_in.rle -o {current}_out.rle".split(),
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            out = p.communicate()
+        ruleflag = ['-s', f'{self.dir}/'] if algo == 'RuleLoader' else ['-r', rule]
+        try:
+            if algo == "CAViewer":
+                preface = f'{self.dir}/resources/bin/CAViewer'
+                _, _, err = await mutils.run_process(
+                    preface, 'sim', '-g', str(gen), '-s', str(step),
+                    '-i', f'{current}_in.rle', '-o', f'{current}_out.rle',
+                    timeout=timeout, limit=self.proc_limit
+                )
+                return err
+            # bgolly reports its errors on stdout
+            _, out, _ = await mutils.run_process(
+                preface, '-a', algo, *ruleflag, '-m', str(gen), '-i', str(step),
+                '-o', f'{current}_out.rle', infile or f'{current}_in.rle',
+                timeout=timeout, limit=self.proc_limit
+            )
+            return out
+        except asyncio.TimeoutError:
+            return f'Error: Timed out after {timeout // 60} minutes'
+        except asyncio.CancelledError:
+            # it's been killed, so whatever it got through is no use to anyone
+            remove_quietly(f'{current}_out.rle')
+            raise
 
-            return out[1].decode("utf-8")
-        else:
-            return os.popen(
-                f'timeout {timeout} {preface} -a "{algo}" -{ruleflag} -m {gen} -i {step} -o {current}_out.rle {current}_in.rle').read()
+    def queue_notifier(self, announcement, details):
+        async def on_move(position):
+            try:
+                await announcement.edit(
+                    content=f'{details}\n(#{position} in queue)' if position else details
+                )
+            except discord.HTTPException:
+                pass
+        return on_move
 
     def moreinfo(self, ctx):
         return f"'{ctx.prefix}help sim' for more info"
@@ -390,6 +1328,65 @@ class CA(commands.Cog):
         fp.write(await self.loop.run_in_executor(None, module.main, rulestring))
         return rulestring
 
+    async def fetch_rule(self, rule):
+        """
+        (name, file, n_states, colors as JSON) of a rule table, from the
+        database or else the wiki. Raises ValueError with the message to
+        send if it can't be found.
+        """
+        row = await self.bot.pool.fetchrow('''
+          SELECT name, file, n_states, colors FROM rules WHERE name = $1::text
+        ''', rule)
+        if row is not None:
+            return tuple(row)
+        # not in the database, so attempt to load rule from wiki
+        try:
+            rulefile = bytes(await mutils.get_rule_from_wiki(rule, self.session), 'utf-8')
+        except FileNotFoundError:  # rule not found
+            raise ValueError('`Error: Rule not found`')
+        rulename, n_states, colors = await self.loop.run_in_executor(None, mutils.extract_rule_info, rulefile)
+        if not n_states:
+            raise ValueError('Error: n_states not found in rule fetched from wiki')
+        if not rulename:
+            raise ValueError('Error: rulename not found in rule fetched from wiki')
+        return rulename, rulefile, n_states, colors
+
+    async def prevalidate_pattern(self, pat, rule):
+        """Precheck for pat in rule, or None if its rule can't be resolved"""
+        algo, n_states = classify(rule)
+        rule_info = None
+        if algo == 'RuleLoader':
+            try:
+                rule_info = await self.fetch_rule(rule)
+            except ValueError:
+                return None
+            n_states = rule_info[2]
+        error, normalized = await self.loop.run_in_executor(
+            None, precheck, pat, None if algo == 'CAViewer' else n_states
+        )
+        return Precheck(algo, n_states, rule_info, error, normalized)
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        # only while idle: this is a head start for sims, not competition for them
+        if not self.prevalidate or message.author.bot or self.scheduler.running or self.scheduler.queue:
+            return
+        rmatch = rXRLE.search(message.content)
+        if not rmatch:
+            return
+        rule = rmatch.group(1)
+        if not rule:
+            # what sim will fall back on, as things stand
+            rmatch_rule, _ = await self.bot.msgindex.latest(message.channel, 'rulestring')
+            rule = rmatch_rule.group() if rmatch_rule else ''
+        rule = ''.join(rule.split()) or 'B3/S23'
+        if '::' in rule:
+            return
+        pat = rmatch.group(2)
+        self.prechecks.add(
+            message.channel.id, pat, rule, asyncio.ensure_future(self.prevalidate_pattern(pat, rule))
+        )
+
     @mutils.group('Simulate an RLE and output to GIF', args=True)
     async def sim(
             self, ctx,
@@ -408,17 +1405,20 @@ class CA(commands.Cog):
         STEP: Step size. Affects simulation speed. If omitted, defaults to 1.
         RULE: Rulestring to simulate PAT under. If omitted, defaults to B3/S23 or rule specified in PAT.
         PAT: One-line rle or .lif file to simulate. If omitted, uses last-sent Golly-compatible pattern (which should be enclosed in a code block and therefore can be a multiliner).
+        A one-row PAT under a Wolfram rule (e.g. W110) is drawn as a single still image of every generation instead.
         #TODO: streamline GIF generation process, implement proper LZW compression, implement flags & gfycat upload
 
         <[FLAGS]>
         -ca: Use CAViewer instead of the default bgolly.
-        -h: Use HashLife instead of the default QuickLife.
+        -h: Use HashLife. If neither this nor -ql is given, QuickLife or HashLife is picked from a quick look at how PAT evolves.
+        -ql: Use QuickLife.
         -time: Include time taken to create gif (in seconds w/hundredths) alongside GIF.
           all: Provide verbose output, showing time taken for each step alongside the type of executor used.
         -tag: When finished, tag requester. Useful for time-intensive simulations.
         -id: Has no function besides appearing above the final output, but can be used to tell apart simultaneously-created gifs.
         -t: Track. Rudimentary impl, nothing smooth -- goes by generation.
         -g: Show grid lines.
+        -trunc: If the GIF won't fit under 8MB, cut it off early instead of skipping frames evenly.
         """
         given_rule, display_given_rule = rule, False
         rand = kwargs.get('rand')
@@ -438,6 +1438,7 @@ class CA(commands.Cog):
 
         track = 'track' in flags or 't' in flags
         grid = 'grid' in flags or 'g' in flags
+        truncate = 'trunc' in flags
 
         person_to_tag = ""
 
@@ -446,30 +1447,21 @@ class CA(commands.Cog):
         except ValueError:
             return await ctx.send(f"`Error: No GEN given. {self.moreinfo(ctx)}`")
         gen = genconvert(gen)
-        if gen / step > 2500:
-            return await ctx.send(f"`Error: Cannot simulate more than 2500 frames. {self.moreinfo(ctx)}`")
         if not pat and not rand:
-            async for msg in ctx.channel.history(limit=50):
-                rmatch = rXRLE.search(msg.content)
-                if rmatch:
-                    person_to_tag = msg.author
-                    pat = rmatch.group(2)
-                    if rmatch.group(1):
-                        rule = rmatch.group(1)
-                    break
+            rmatch, author = await self.bot.msgindex.latest(ctx.channel, 'xrle')
+            if rmatch:
+                person_to_tag = author
+                pat = rmatch.group(2)
+                if rmatch.group(1):
+                    rule = rmatch.group(1)
             if not pat:
                 return await ctx.send(f"`Error: No PAT given and none found in last 50 messages. {self.moreinfo(ctx)}`")
         elif pat and not rand:
             pat = pat.strip('`')
 
         if not rule:
-            async for msg in ctx.channel.history(limit=50):
-                rmatch = rLtL.search(msg.content) or rRULESTRING.search(msg.content)
-                if rmatch:
-                    rule = rmatch.group()
-                    break
-            else:
-                rule = ''
+            rmatch, _ = await self.bot.msgindex.latest(ctx.channel, 'rulestring')
+            rule = rmatch.group() if rmatch else ''
 
         bg, fg = ((255, 255, 255), (0, 0, 0)) if 'bw' in flags else ((54, 57, 62), (255, 255, 255))
         colors = {'o': fg, 'b': bg}
@@ -477,7 +1469,12 @@ class CA(commands.Cog):
         current = f'{self.dir}/{ctx.message.id}'
         rule = ''.join(rule.split()) or 'B3/S23'
 
+        pre = None
+        if not rand and algo == 'QuickLife' and '::' not in given_rule:
+            pre = await self.prechecks.get(ctx.channel.id, pat, rule)
+
         n_states = 2
+        rulefile = None
         if '::' in given_rule:
             rulestring, name = given_rule.split('::')
             rulestring = rulestring or rule.split('::')[0]
@@ -489,58 +1486,49 @@ class CA(commands.Cog):
             rule = f'{rulestring}_{ctx.message.id}'
             given_rule = rulestring
             display_given_rule = True
-        elif rLtL.match(rule):
-            algo = 'Larger than Life'
-            n_states = 2 + int(rLtL.match(rule)[1])
-        elif not rRULESTRING.fullmatch(rule) and rCAVIEWER.fullmatch(rule):
-            algo = 'CAViewer'
-        elif not rRULESTRING.fullmatch(rule) and algo != "CAViewer":
-            algo = 'RuleLoader'
+        elif pre is not None:
+            algo, n_states = pre.algo, pre.n_states
+        else:
+            algo, n_states = classify(rule, algo)
 
         if algo == 'RuleLoader':
             try:
-                rulename, rulefile, n_states, colors = await self.bot.pool.fetchrow('''
-                  SELECT name, file, n_states, colors FROM rules WHERE name = $1::text
-                ''', rule)
-            except TypeError:  # rule not found
-                # first, attempt to load rule from wiki
-                try:
-                    rulefile = bytes(mutils.get_rule_from_wiki(rule, self.session), 'utf-8')
-                except FileNotFoundError:  # rule not found
-                    return await ctx.send('`Error: Rule not found`')
-
-                rulename, n_states, colors = await self.loop.run_in_executor(
-                    None,
-                    mutils.extract_rule_info,
-                    rulefile
+                rulename, rulefile, n_states, colors = (
+                  pre.rule_info if pre is not None and pre.rule_info is not None else await self.fetch_rule(rule)
                 )
-                if not n_states:
-                    return await ctx.send('Error: n_states not found in rule fetched from wiki')
-                if not rulename:
-                    return await ctx.send('Error: rulename not found in rule fetched from wiki')
-
+            except ValueError as e:
+                return await ctx.send(str(e))
             bg, colors = mutils.colorpatch(json.loads(colors), n_states, fg, bg)
             with open(f'{self.dir}/{rulename}_{ctx.message.id}.rule', 'wb') as ruleout:
                 ruleout.write(rulefile)
-        if algo == 'Larger than Life':
-            n_states = int(rule.split('C')[1].split(',')[0])
-            if n_states > 2:
-                colors = mutils.ColorRange(n_states, (255, 255, 0), (255, 0, 0)).to_dict()
-        if rule.count('/') > 1 and '::' not in rule and algo != "CAViewer":
-            algo = 'Generations'
-            n_states = int(rule.split('/')[-1])
+        if algo == 'Larger than Life' and n_states > 2:
+            colors = mutils.ColorRange(n_states, (255, 255, 0), (255, 0, 0)).to_dict()
+        if algo == 'Generations':
             colors = mutils.ColorRange(n_states).to_dict()
         if algo == 'CAViewer':
             rule_content = None
-            async for msg in ctx.channel.history(limit=50):
-                # Account for code tags
-                if rRULE.search(msg.content): rule_content = msg.content.replace("`", "")
+            rmatch, _ = await self.bot.msgindex.latest(ctx.channel, 'ruletable')
+            # Account for code tags
+            if rmatch: rule_content = rmatch.string.replace("`", "")
 
             if rule_content is not None and False:  # TODO Make this work
                 with open(f"{self.dir}/Temporary.rule", "w+") as f:
                     f.write(rule_content)
                 rule = "Temporary"
 
+        if not rand:
+            if pre is not None:
+                # already validated while nobody was waiting on it
+                error = pre.error
+            else:
+                try:
+                    await self.loop.run_in_executor(None, rle.validate, pat, None if algo == 'CAViewer' else n_states)
+                    error = None
+                except ValueError as e:
+                    error = e
+            if error is not None:
+                return await ctx.send(f'`Error: {error}. {self.moreinfo(ctx)}`')
+
         if rand:
             rule_ = rule.split('::')[0]
             if algo == 'RuleLoader':
@@ -557,51 +1545,133 @@ class CA(commands.Cog):
             )
             dims = f'{dims[0]}\u00d7{dims[1]}'
 
+        if not rand and algo in ('QuickLife', 'HashLife') and isinstance(engines.find(rule), engines.Wolfram):
+            # a one-row pattern's whole history fits in one still image, so isn't worth a GIF
+            start = time.perf_counter()
+            try:
+                data = await self.loop.run_in_executor(
+                    execs[1][0], spacetime,
+                    pat if pat.startswith('x = ') else f'x = 0, y = 0, rule = {rule}\n{pat}',
+                    rule, gen, colors, bg, grid
+                )
+            except engines.Unsupported:
+                pass
+            else:
+                self.simlog.append(Log(ctx.author.mention, rule, ctx.message.created_at, Status.COMPLETED))
+                return await ctx.send(
+                    (ctx.message.author.mention if 'tag' in flags else f'By {(person_to_tag or ctx.message.author).mention}')
+                    + (f' **{discord.utils.escape_mentions(flags["id"])}**' if 'id' in flags else '')
+                    + (f'\n{round(time.perf_counter() - start, 2)}s' if 'time' in flags else ''),
+                    file=discord.File(io.BytesIO(data), f'{ctx.message.id}.png')
+                )
+        if gen / step > 2500:
+            return await ctx.send(f"`Error: Cannot simulate more than 2500 frames. {self.moreinfo(ctx)}`")
+
+        # QuickLife or HashLife is picked once bgolly's turn comes, if it comes (see pick_algo())
+        auto = algo == 'QuickLife' and 'ql' not in flags
+
         details = (
                 (f'Running `{dims}` soup' if rand else f'Running supplied pattern')
                 + f' in rule `{given_rule if display_given_rule else rule}` with '
                 + f'step `{step}` for `{1 + gen}` generation(s)'
                 + (f' using `{algo}`.' if algo != 'QuickLife' else '.')
         )
+        # CAViewer doesn't tell us how many states its rules have
+        n_frame_states = 256 if algo == 'CAViewer' else n_states
         announcement = await ctx.send(details)
-        curlog = Log(ctx.author.mention, rule, ctx.message.created_at, Status.WAITING)
-        self.simlog.append(curlog)
         writrule = f'{rule}_{ctx.message.id}' if algo == 'RuleLoader' else rule
-        with open(f'{current}_in.rle', 'w') as infile:
-            infile.write(pat if pat.startswith('x = ') else f'x = 0, y = 0, rule = {writrule}\n{pat}')
-        bg_err = await self.run_bgolly(current, algo, gen, step, rule)
-        if bg_err:
-            curlog.status = Status.FAILED
-            return await ctx.send(f'```{bg_err}```')
-        await announcement.add_reaction('\N{WASTEBASKET}')
-        curlog.status = Status.SIMMING
-
-        try:
-            resp = await mutils.await_event_or_coro(
-                self.bot,
-                event='reaction_add',
-                coro=self.do_gif(execs, current, gen, step, colors, track, bg, grid),
-                ret_check=lambda obj: isinstance(obj, discord.Message),
-                event_check=lambda rxn, usr: self.cancellation_check(ctx, announcement, rxn, usr)
+        in_rle = pat if pat.startswith('x = ') else f'x = 0, y = 0, rule = {writrule}\n{pat}'
+        cache_key = hit = None
+        # generated rules are named after the message that asked for them, so could never be hit again
+        if not rand and not algo.startswith('RuleLoader::'):
+            cache_key = await self.loop.run_in_executor(
+                None, functools.partial(
+                    simcache.key,
+                    pat, rule, algo, gen, step, track, grid, colors, bg, truncate,
+                    normalized=pre and pre.normalized, rulefile=rulefile
+                )
             )
-        except FileNotFoundError:
-            curlog.status = Status.FAILED
-            return await ctx.send(f'Error: Timed out')
-        except concurrent.futures.process.BrokenProcessPool:
-            curlog.status = Status.FAILED
-            return await ctx.send("Error: You almost made me crash... :angry:")
-        except MemoryError:
-            curlog.status = Status.FAILED
-            return await ctx.send("Error: You made me run out of memory... :angry:")
-        except Exception as e:
-            curlog.status = Status.FAILED
-            # return await ctx.send(f"Error: `{str(e)}`")
-            raise e
-        try:
-            start, end_parse, end_makeframes, oversized = resp['coro']
-        except (KeyError, ValueError):
-            curlog.status = Status.CANCELED
-            return await resp['event'][0].message.delete()
+            hit = await self.loop.run_in_executor(None, self.simcache.get, cache_key)
+        if hit is not None:
+            # Seen this exact sim before: skip straight to posting it
+            curlog = Log(ctx.author.mention, rule, ctx.message.created_at, Status.SIMMING, algo=algo)
+            self.simlog.append(curlog)
+            data, meta = hit
+            oversized = meta['cut'] and tuple(meta['cut'])
+            session = None
+            start = end_parse = end_makeframes = time.perf_counter()
+            # still needed if ➕ or ⏩ gets pressed
+            with open(f'{current}_in.rle', 'w') as infile:
+                infile.write(in_rle)
+            await announcement.add_reaction('\N{WASTEBASKET}')
+        else:
+            # Identical sims already on their way get joined rather than run again
+            flight = self.flights.get(cache_key)
+            # the flight reads its rule file from whoever started it
+            owns_flight = flight is None
+            if flight is None:
+                try:
+                    job = self.scheduler.submit(ctx.author.id, ctx.guild.id, sched.estimate_cost(gen, step, pat))
+                except sched.QueueFull as e:
+                    await announcement.delete()
+                    return await ctx.send(f'`Error: {e}.`')
+                flight = self.flights.start(
+                    cache_key, job,
+                    lambda flight: self.first_render(
+                        flight, cache_key, current, in_rle, algo, gen, step, rule,
+                        execs, colors, track, bg, grid, n_frame_states, truncate, choose=auto
+                    )
+                )
+            running = flight.job in self.scheduler.running
+            curlog = Log(
+                ctx.author.mention, rule, ctx.message.created_at, Status.SIMMING if running else Status.WAITING, flight.job,
+                *(flight.choice or (algo, None))
+            )
+            self.simlog.append(curlog)
+            await announcement.add_reaction('\N{WASTEBASKET}')
+
+            try:
+                resp = await mutils.race_event(
+                    self.bot,
+                    'reaction_add',
+                    flight.join(self.queue_notifier(announcement, details), curlog),
+                    check=lambda rxn, usr: self.cancellation_check(ctx, announcement, rxn, usr)
+                )
+            except FileNotFoundError:
+                curlog.status = Status.FAILED
+                return await ctx.send(f'Error: Timed out')
+            except concurrent.futures.process.BrokenProcessPool:
+                curlog.status = Status.FAILED
+                return await ctx.send("Error: You almost made me crash... :angry:")
+            except MemoryError:
+                curlog.status = Status.FAILED
+                return await ctx.send("Error: You made me run out of memory... :angry:")
+            except Exception as e:
+                curlog.status = Status.FAILED
+                # return await ctx.send(f"Error: `{str(e)}`")
+                raise e
+            if resp.winner == 'event' or isinstance(resp.value, str):
+                if algo == 'RuleLoader':
+                    rulepath = f'{self.dir}/{rule}_{ctx.message.id}.rule'
+                    if owns_flight and not flight.task.done():
+                        # others may still be waiting on the flight, which needs it till it's done
+                        flight.task.add_done_callback(lambda _: remove_quietly(rulepath))
+                    else:
+                        remove_quietly(rulepath)
+            if resp.winner == 'event':
+                curlog.status = Status.CANCELED
+                return await announcement.delete()
+            if isinstance(resp.value, str):
+                curlog.status = Status.FAILED
+                return await ctx.send(f'```{resp.value}```')
+            start, end_parse, end_makeframes, data, oversized, session = resp.value
+            if flight.claimed:
+                # only one of the sims sharing this render can carry on its GIF with ➕
+                session = Session(session.gen, session.bbox, session.trackmaxes, None, None, session.cache)
+            flight.claimed = True
+            # a joined sim ran under someone else's files, but still needs its own for ➕ and ⏩
+            with open(f'{current}_in.rle', 'w') as infile:
+                infile.write(in_rle)
         content = (
                 (ctx.message.author.mention if 'tag' in flags else '')
                 + (f' **{discord.utils.escape_mentions(flags["id"])}** \n' if 'id' in flags else '')
@@ -609,10 +1679,15 @@ class CA(commands.Cog):
         )
         curlog.status = Status.COMPLETED
 
+        url = hit and hit[1]['url']
+        if url and not await self.url_alive(url):
+            url = None
         try:
             gif = await ctx.send(
                 content.format(
-                    time=str(
+                    time='(cached)'
+                    if hit and 'time' in flags
+                    else str(
                         {
                             'Times': '',
                             '**Parsing frames**': f'{round(end_parse - start, 2)}s ({execs[0][1]})',
@@ -624,9 +1699,11 @@ class CA(commands.Cog):
                     else f'{round(end_makeframes - start, 2)}s'
                     if 'time' in flags
                     else ''
-                ) + ('\n(Truncated to fit under 8MB)' if oversized else ''),
-                file=discord.File(f'{current}.gif')
+                ) + cut_note(oversized) + (f'\n{url}' if url else ''),
+                file=None if url else discord.File(io.BytesIO(data), f'{ctx.message.id}.gif')
             )
+            if cache_key is not None and gif.attachments:
+                await self.loop.run_in_executor(None, self.simcache.set_url, cache_key, gif.attachments[0].url)
             newline = '\n' * bool(gif.content)
             if 'tag' not in flags:
                 if person_to_tag != "":
@@ -638,15 +1715,20 @@ class CA(commands.Cog):
             return await ctx.send(
                 f'{ctx.message.author.mention}\n`HTTP 413: GIF too large. Try a higher STEP or lower GEN!`')
 
+        def extendable():
+            """Whether ➕ can carry on the GIF: there's room, and it wasn't cut down (so ends on a checkpoint)"""
+            return gen < 2500 * step and not oversized and (session is None or session.last is not None)
+
         def extension_or_deletion_check(rxn, usr):
             if usr == ctx.message.author or usr.id == WRIGHT:
                 if rxn.emoji in '➕⏩' and rxn.message.id == gif.id:
-                    return True
+                    # ➕ may have been added by hand where it wasn't offered
+                    return rxn.emoji == '⏩' or extendable()
                 return rxn.emoji == '\N{WASTEBASKET}' and rxn.message.id == announcement.id
 
         try:
             while True:
-                if gen < 2500 * step and not oversized:
+                if extendable():
                     await gif.add_reaction('➕')
                 await gif.add_reaction('⏩')
                 rxn, _ = await self.bot.wait_for('reaction_add', timeout=25.0, check=extension_or_deletion_check)
@@ -665,20 +1747,25 @@ class CA(commands.Cog):
                         + (f' using `{algo}`.' if algo != 'QuickLife' else '.')
                 )
                 await announcement.edit(content=details)
-                bg_err = await self.run_bgolly(current, algo, gen, step, rule)
-                if bg_err:
-                    return await ctx.send(f'`{bg_err}`')
-                resp = await mutils.await_event_or_coro(
-                    self.bot,
-                    event='reaction_add',
-                    coro=self.do_gif(execs, current, gen, step, colors, track, bg, grid),
-                    ret_check=lambda obj: isinstance(obj, discord.Message),
-                    event_check=lambda rxn, usr: self.cancellation_check(ctx, announcement, rxn, usr)
-                )
                 try:
-                    start, end_parse, end_makeframes, oversized = resp['coro']
-                except KeyError:
-                    return await resp['event'][0].message.delete()
+                    job = self.scheduler.submit(ctx.author.id, ctx.guild.id, sched.estimate_cost(gen, step, pat))
+                except sched.QueueFull as e:
+                    return await ctx.send(f'`Error: {e}.`')
+                async with self.scheduler.turn(job, on_move=self.queue_notifier(announcement, details)):
+                    resp = await mutils.race_event(
+                        self.bot,
+                        'reaction_add',
+                        self.rerender(
+                            rxn.emoji, session, execs, current, in_rle, algo, gen, step, rule,
+                            colors, track, bg, grid, n_frame_states, truncate, curlog.choose if auto else None
+                        ),
+                        check=lambda rxn, usr: self.cancellation_check(ctx, announcement, rxn, usr)
+                    )
+                if resp.winner == 'event':
+                    return await announcement.delete()
+                if isinstance(resp.value, str):
+                    return await ctx.send(f'`{resp.value}`')
+                start, end_parse, end_makeframes, data, oversized, session = resp.value
                 try:
                     gif = await ctx.send(
                         content.format(
@@ -694,8 +1781,8 @@ class CA(commands.Cog):
                             else f'{round(end_makeframes - start, 2)}s'
                             if 'time' in flags
                             else ''
-                        ) + ('\n(Truncated to fit under 8MB)' if oversized else ''),
-                        file=discord.File(f'{current}.gif')
+                        ) + cut_note(oversized),
+                        file=discord.File(io.BytesIO(data), f'{ctx.message.id}.gif')
                     )
                     if 'tag' not in flags:
                         await gif.edit(content=f'By {ctx.author.mention}{newline}{gif.content}')
@@ -708,7 +1795,6 @@ class CA(commands.Cog):
             gif = await ctx.channel.fetch_message(gif.id)  # refresh reactions
             await announcement.remove_reaction('\N{WASTEBASKET}', ctx.guild.me)
             [await gif.remove_reaction(rxn, ctx.guild.me) for rxn in gif.reactions]
-            os.remove(f'{current}.gif')
             os.remove(f'{current}_in.rle')
             if algo == 'RuleLoader':
                 os.remove(f'{self.dir}/{rule}_{ctx.message.id}.rule')
@@ -760,11 +1846,9 @@ class CA(commands.Cog):
             if gen is None:
                 return await ctx.send(f'`Error: No GEN given. {self.moreinfo(ctx)}`')
         if not rule:
-            async for msg in ctx.channel.history(limit=50):
-                rmatch = rLtL.search(msg.content) or rRULESTRING.search(msg.content)
-                if rmatch:
-                    rule = rmatch.group()
-                    break
+            rmatch, _ = await self.bot.msgindex.latest(ctx.channel, 'rulestring')
+            if rmatch:
+                rule = rmatch.group()
         x, y = map(int, dims.split('x'))
         if x > 1500 or y > 1500:
             return await ctx.send(
@@ -791,13 +1875,19 @@ class CA(commands.Cog):
         entries = []
         comp = ('⌛', '💬', '🗑', '✅', '❌')
         for log in self.simlog:
+            position = log.status is Status.WAITING and self.scheduler.position(log.job)
             entries.append(
                 f'• {log.invoker}'
                 f' in `{log.rule}`'
-                f" at `{log.time.strftime('%H:%M')}`:"
+                + (f' with {log.algo} ({log.reason})' if log.reason else '')
+                + f" at `{log.time.strftime('%H:%M')}`:"
                 f' {comp[log.status.value]} {log.status.name.title()}'
+                + (f' (#{position} in queue)' if position else '')
             )
-        await ctx.send(embed=discord.Embed(title='Last 5 sims', description='\n'.join(entries)))
+        await ctx.send(embed=discord.Embed(
+            title='Last 5 sims',
+            description='\n'.join(entries)
+        ).set_footer(text=f'{len(self.scheduler.running)} running, {len(self.scheduler)} queued'))
 
     @mutils.command('Show uploaded rules')
     async def rules(self, ctx, rule=None):
@@ -847,7 +1937,7 @@ class CA(commands.Cog):
             except StopIteration: # find rule failed
                 em = discord.Embed(title=f'Rule:{rule}', description='LifeWiki rule', type='rich',
                                    url=f'https://conwaylife.com/wiki/Rule:{rule}')
-                file = io.BytesIO(bytes(mutils.get_rule_from_wiki(rule, self.session), encoding="utf-8")) # oh no another nested try/except?
+                file = io.BytesIO(bytes(await mutils.get_rule_from_wiki(rule, self.session), encoding="utf-8")) # oh no another nested try/except?
                 return await ctx.send(embed=em, file=discord.File(file, filename=f"{rule}.rule"))
         else:
             return await ctx.send(embed=discord.Embed(
@@ -1091,14 +2181,12 @@ class CA(commands.Cog):
 
         preface = f'{self.dir}/resources/bin/CAViewer'
 
-        p = subprocess.Popen(
-            f"{preface} apgtable -r {rule} -o {self.dir}/resources/{name}.rule".split(),
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        _, _, err = await mutils.run_process(
+            *f"{preface} apgtable -r {rule} -o {self.dir}/resources/{name}.rule".split(), limit=self.proc_limit
         )
-        out = p.communicate()
 
         # An error occured
-        if out[1].decode("utf-8"): return await ctx.send(f'`{out[1].decode("utf-8")}`')
+        if err: return await ctx.send(f'`{err}`')
 
         with open(f"{self.dir}/resources/{name}.rule") as f:
             return await ctx.send(file=discord.File(f, name + '.rule'))
@@ -1113,14 +2201,10 @@ class CA(commands.Cog):
 
         preface = f'{self.dir}/resources/bin/CAViewer'
 
-        p = subprocess.Popen(f"{preface} info -r {rule}".split(),
-                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        out = p.communicate()
+        _, desc, err = await mutils.run_process(*f"{preface} info -r {rule}".split(), limit=self.proc_limit)
 
         # An error occured
-        if out[1].decode("utf-8"): return await ctx.send(f'`{out[1].decode("utf-8")}`')
-
-        desc = out[0].decode("utf-8")
+        if err: return await ctx.send(f'`{err}`')
 
         # Bold the key text
         for text in re.findall("[\S ]+:", desc):
@@ -1140,11 +2224,9 @@ class CA(commands.Cog):
         -m: Maximum period to try to detect
         """
         pat = ""
-        async for msg in ctx.channel.history(limit=50):
-            rmatch = rXRLE.search(msg.content)
-            if rmatch:
-                pat = rmatch.group()
-                break
+        rmatch, _ = await self.bot.msgindex.latest(ctx.channel, 'xrle')
+        if rmatch:
+            pat = rmatch.group()
         if not pat:
             return await ctx.send(f"`Error: No PAT found in last 50 messages.`")
 
@@ -1152,23 +2234,29 @@ class CA(commands.Cog):
         with open(f'{current}_in.rle', 'w') as infile:
             infile.write(pat)
 
+        await ctx.message.add_reaction('\N{WASTEBASKET}')
         try:
-            resp = await mutils.await_event_or_coro(
+            resp = await mutils.race_event(
                 self.bot,
-                event='reaction_add',
-                coro=self.identify_func(f'{current}_in.rle', int(flags.get('m', 200)))
+                'reaction_add',
+                self.identify_func(f'{current}_in.rle', int(flags.get('m', 200))),
+                check=lambda rxn, usr: self.cancellation_check(ctx, ctx.message, rxn, usr)
             )
         except MemoryError:
             return await ctx.send(f"Error: Ran out of memory :frowning:")
         except Exception as e:
             return await ctx.send(f"Error: `{str(e)}`")
+        finally:
+            await ctx.message.remove_reaction('\N{WASTEBASKET}', ctx.me)
+        if resp.winner == 'event':
+            return
 
-        out = resp["event"]
-        if "null" in out[0].decode("utf-8"): return await ctx.send("Identification Failed! :vsad:")
-        if out[1].decode("utf-8"):
-            return await ctx.send(f"Error: ```{out[1].decode('utf-8')}```")
+        out = resp.value
+        if "null" in out[0]: return await ctx.send("Identification Failed! :vsad:")
+        if out[1]:
+            return await ctx.send(f"Error: ```{out[1]}```")
 
-        desc = out[0].decode("utf-8")
+        desc = out[0]
 
         lines = desc.split("\n")
         title = lines[0]
@@ -1182,11 +2270,10 @@ class CA(commands.Cog):
 
     async def identify_func(self, file, max_period):
         preface = f'{self.dir}/resources/bin/CAViewer'
-        p = subprocess.Popen(
-            f"{preface} identify -i {file} -g {max_period}".split(),
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        out = await self.bot.loop.run_in_executor(None, p.communicate)
-        return out
+        _, out, err = await mutils.run_process(
+            *f"{preface} identify -i {file} -g {max_period}".split(), limit=self.proc_limit
+        )
+        return out, err
 
     @mutils.command()
     async def delgen(self, ctx, name):
@@ -1,13 +1,12 @@
 import os
 import re
 import discord
-import subprocess
 import urllib.request
 import urllib.error
 
 from discord.ext import commands
 
-from cogs.resources import mutils
+from cogs.resources import mutils, rle
 
 WRIGHT = 180809886374952960
 
@@ -60,6 +59,8 @@ class DB(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.dir = os.path.dirname(os.path.abspath(__file__))
+        # not quite the same regex as ca.py's, so indexed separately
+        self.bot.msgindex.track('db.xrle', rXRLE.search)
 
     @mutils.command('Query the 5S database')
     async def sssss(self, ctx, velocity):
@@ -86,16 +87,14 @@ class DB(commands.Cog):
         else:
             database = f'{self.dir}/resources/db/oblique.sss.txt'
 
-        p = subprocess.Popen(
-            f"{preface} 5s -v {velocity} -db {database}".split(),
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        out = p.communicate()
+        _, out, err = await mutils.run_process(
+            *f"{preface} 5s -v {velocity} -db {database}".split(), limit=self.bot.proc_limit
+        )
 
-        err = out[1].decode("utf-8")
         if err:
             return await ctx.send(f"```{err}```")
         else:
-            return await ctx.send(f"```{out[0].decode('utf-8')}```")
+            return await ctx.send(f"```{out}```")
 
     @mutils.command('Query the SOSSP database')
     async def sossp(self, ctx, period):
@@ -109,16 +108,14 @@ class DB(commands.Cog):
         database = f'{self.dir}/resources/db/sossp.sss.txt'
 
         period = period.replace("P", "")
-        p = subprocess.Popen(
-            f"{preface} 5s -p {int(period)} -db {database}".split(),
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        out = p.communicate()
+        _, out, err = await mutils.run_process(
+            *f"{preface} 5s -p {int(period)} -db {database}".split(), limit=self.bot.proc_limit
+        )
 
-        err = out[1].decode("utf-8")
         if err:
             return await ctx.send(f"```{err}```")
         else:
-            return await ctx.send(f"```{out[0].decode('utf-8')}```")
+            return await ctx.send(f"```{out}```")
 
     @mutils.command('Query the GliderDB database', args=True)
     async def gliderdb(self, ctx, *, flags):
@@ -224,7 +221,7 @@ class DB(commands.Cog):
         elif sort == "slope":
             results = sorted(results, key=lambda k: (abs(int(k[5])), abs(int(k[6]))), reverse=desc)
         elif sort == "population":
-            results = sorted(results, key=lambda k: sum(map(lambda s: s and int(s) or 1, re.sub(r"\d*[.B-Z$]|!", "", k[-1]).split("A"))) - 1, reverse=desc)  # Code-golf by AForAwesome
+            results = sorted(results, key=lambda k: rle.population(k[-1], 1), reverse=desc)
 
         count = 0
         for tokens in results:
@@ -237,7 +234,7 @@ class DB(commands.Cog):
             if tokens[1]: discoverer = f"#C Discovered by: {tokens[1]}\n"
             else: discoverer = ""
 
-            pop = sum(map(lambda s: s and int(s) or 1, re.sub(r'\d*[.B-Z$]|!', '', tokens[-1]).split('A'))) - 1
+            pop = rle.population(tokens[-1], 1)
             msg = f"```#C {pattern}\n" + name + discoverer + f"#C Min Rule: {tokens[2]}\n#C Max Rule: {tokens[3]}\n#C Population: {pop}\nx = {tokens[-3]}, y = {tokens[-2]}, rule = {tokens[2]}\n{tokens[-1]}```"
             if len(msg) > 2000:
                 with open(f"{self.dir}/resources/db/pattern.rle", "w") as f:
@@ -261,11 +258,9 @@ class DB(commands.Cog):
         """
 
         pat = ""
-        async for msg in ctx.channel.history(limit=50):
-            rmatch = rXRLE.search(msg.content)
-            if rmatch:
-                pat = rmatch.group()
-                break
+        rmatch, _ = await self.bot.msgindex.latest(ctx.channel, 'db.xrle')
+        if rmatch:
+            pat = rmatch.group()
         if not pat:
             return await ctx.send(f"`Error: No PAT found in last 50 messages.`")
 
@@ -273,31 +268,35 @@ class DB(commands.Cog):
         with open(f'{current}_in.rle', 'w') as infile:
             infile.write(pat)
 
+        await ctx.message.add_reaction('\N{WASTEBASKET}')
         try:
-            resp = await mutils.await_event_or_coro(
+            resp = await mutils.race_event(
                 self.bot,
-                event='reaction_add',
-                coro=self.gen_entry(f'{current}_in.rle')
+                'reaction_add',
+                self.gen_entry(f'{current}_in.rle'),
+                check=lambda rxn, usr: (
+                  rxn.message.id == ctx.message.id and usr == ctx.author and rxn.emoji == '\N{WASTEBASKET}'
+                )
             )
         except MemoryError:
             return await ctx.send(f"Error: Ran out of memory :frowning:")
         except Exception as e:
             return await ctx.send(f"Error: `{str(e)}`")
+        finally:
+            await ctx.message.remove_reaction('\N{WASTEBASKET}', ctx.me)
+        if resp.winner == 'event':
+            return
 
-        out = resp["event"]
-        if out[1].decode("utf-8"):
-            return await ctx.send(f"Error: ```{out[1].decode('utf-8')}```")
+        out = resp.value
+        if out[1]:
+            return await ctx.send(f"Error: ```{out[1]}```")
 
-        return await ctx.send("```" + out[0].decode("utf-8") + "```")
+        return await ctx.send("```" + out[0] + "```")
 
     async def gen_entry(self, file):
         preface = f'{self.dir}/resources/bin/CAViewer'
-        p = subprocess.Popen(
-            f"{preface} entry -i {file}".split(),
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        out = await self.bot.loop.run_in_executor(None, p.communicate)
-
-        return out
+        _, out, err = await mutils.run_process(*f"{preface} entry -i {file}".split(), limit=self.bot.proc_limit)
+        return out, err
 
 
 def setup(bot):
@@ -0,0 +1,130 @@
+"""
+In-process simulators for rules simple enough not to need bgolly.
+
+For a small sim, spawning bgolly, having it write every generation out as
+RLE text and parsing that back in costs more than the simulating does. An
+engine here steps a NumPy array of states instead, and run() hands back
+the generations as arrays in bgolly's output order, ready to be drawn.
+Patterns spread over too big an area for that are stepped a tile at a time
+instead (see tiles), and their generations handed back as Tiles. Those in
+between are left to bgolly, which beats both at that size.
+
+Engines only ever stand in for bgolly: anything they can't or shouldn't
+run raises Unsupported, and the caller falls back on bgolly.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from cogs.resources import rle
+
+from .generations import Generations
+from .lifelike import LifeLike
+from .ltl import LargerThanLife
+from .lut import LUT
+from .tiles import TILE, Tiled, Tiles, around
+from .wolfram import Wolfram
+
+# tried in order: more specialized (and faster) first
+ENGINES = [LifeLike, LUT, Generations, LargerThanLife, Wolfram]
+# Bounding box areas up to which run() steps a pattern as one array, and past
+# which it steps it a tile at a time. Tiles only pay for themselves once most
+# of a pattern's area is empty (bench_engines has them slower than bgolly at
+# 1024x1024 and 2048x2048), so patterns in between are left to bgolly.
+DENSE_MAX_AREA = 512 * 512
+TILED_MIN_AREA = 4096 * 4096
+
+
+class Unsupported(Exception):
+    """Raised when a sim should be left to bgolly after all"""
+
+
+class TooBig(Unsupported):
+    """Raised when a pattern outgrows what's worth simulating in-process"""
+
+
+@lru_cache(maxsize=64)
+def find(rule):
+    """An engine that can run rule, or None. Engines are cached, so mustn't be changed."""
+    for engine in ENGINES:
+        found = engine.from_rule(rule)
+        if found is not None:
+            # B0 rules (births in an empty universe) need the background to
+            # strobe, which bgolly deals with and engines don't
+            return None if found.step(np.zeros((0, 0), np.uint8)).any() else found
+    return None
+
+
+def run(engine, cells, pos, gen, step, *, max_work, max_cells, on_step=None):
+    """
+    Simulate like `bgolly -m gen -i step` does: returns a list of
+    ((x, y), (width, height), cells) for generations 0, step, 2*step...
+    up to the first multiple of step at or past gen, each cropped to its
+    bounding box and positioned the same as in bgolly's output.
+
+    engine: From find(); its step() grows a pattern by engine.reach cells a side
+    cells: The pattern, as a 2D array of states with its top left at pos,
+      or Tiles (and pos ignored) if it's too spread out for that
+    max_work: Cell updates (summed over every generation's area) to give up after
+    max_cells: Cells (summed over every returned generation) to give up after
+    on_step: Called once a generation, e.g. to raise if the sim's been cancelled
+
+    Once a pattern's bounding box outgrows DENSE_MAX_AREA, it's carried on
+    with as Tiles, and so are the generations returned from then on, if
+    it's past TILED_MIN_AREA; if not, TooBig is raised. (Engines whose reach
+    is too big for tiles carry on as one array regardless.) TooBig is also
+    raised if either limit is hit.
+    """
+    last = -(-gen // step) * step
+    out = []
+    work = stored = 0
+    if isinstance(cells, Tiles):
+        tiled, tiler = cells, Tiled(engine)
+        active = around(tiled.tiles)
+        fresh = set(tiled.tiles)
+    else:
+        tiled = None
+        cells, (dx, dy) = rle.crop(cells)
+        x, y = pos[0] + dx, pos[1] + dy
+    for i in range(last + 1):
+        if tiled is None and cells.size > DENSE_MAX_AREA and engine.reach <= TILE:
+            if cells.size <= TILED_MIN_AREA:
+                raise TooBig
+            tiled, tiler = Tiles.from_array(cells, (x, y)), Tiled(engine)
+            active = around(tiled.tiles)
+            fresh = set(tiled.tiles)
+        if i % step == 0:
+            if tiled is not None:
+                bounds = tiled.bounds()
+            elif cells.size:
+                bounds = x, y, *cells.shape[::-1]
+            else:
+                bounds = None
+            if bounds is None:
+                # what bgolly gives for an empty universe
+                out.append(((1, 1), (1, 1), np.zeros((1, 1), np.uint8)))
+            else:
+                out.append((bounds[:2], bounds[2:], cells if tiled is None else tiled))
+            if tiled is None:
+                stored += cells.size
+            else:
+                # tiles that haven't changed since the last generation kept are shared with it
+                stored += len(fresh & tiled.tiles.keys()) * TILE * TILE
+                fresh = set()
+        if i == last:
+            break
+        if tiled is None:
+            work += (cells.shape[0] + 2 * engine.reach) * (cells.shape[1] + 2 * engine.reach)
+        else:
+            work += len(active) * (TILE + 2 * engine.reach) ** 2
+        if work > max_work or stored > max_cells:
+            raise TooBig
+        if on_step is not None:
+            on_step()
+        if tiled is not None:
+            tiled, changed, active = tiler.step(tiled, active)
+            fresh |= changed
+        elif cells.size:
+            cells, (dx, dy) = rle.crop(engine.step(cells))
+            x, y = x - engine.reach + dx, y - engine.reach + dy
+    return out
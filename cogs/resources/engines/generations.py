@@ -0,0 +1,69 @@
+"""
+Generations rules (S/B/N, e.g. 345/2/4): live cells that fail to survive
+don't die outright but count down through N - 2 dying states first, and
+only live cells count as neighbours. Hexagonal (H) and von Neumann (V)
+variants are handled as in lifelike.
+
+Cells are uint8 state indices, 0 dead, 1 alive and 2 to N - 1 dying, the
+same as bgolly's multistate RLE, so frames go straight to the renderer.
+"""
+import re
+
+import numpy as np
+
+from .lifelike import NEIGHBOURHOODS
+
+# 345/2/4 (survival first)
+rSBN = re.compile(r'([0-8]*)/([0-8]*)/(\d{1,3})([HV]?)', re.I)
+
+
+class Generations:
+    reach = 1
+
+    def __init__(self, birth, survival, n_states, neighbourhood=''):
+        """
+        birth, survival: Iterables of live neighbour counts
+        n_states: Total number of states, dead and alive included
+        neighbourhood: '' for Moore, 'H' for hexagonal or 'V' for von Neumann
+        """
+        self.offsets = NEIGHBOURHOODS[neighbourhood.upper()]
+        self.n_states = n_states
+        self.birth = np.zeros(9, bool)
+        self.birth[list(birth)] = True
+        self.survival = np.zeros(9, bool)
+        self.survival[list(survival)] = True
+
+    @classmethod
+    def from_rule(cls, rule):
+        """Generations for an S/B/N rulestring of 2 to 256 states such as 345/2/4 or 12/34/3V, or None"""
+        m = rSBN.fullmatch(rule)
+        if not m:
+            return None
+        survival, birth, n_states, neighbourhood = m.groups()
+        birth, survival, n_states = set(map(int, birth)), set(map(int, survival)), int(n_states)
+        n_neighbours = len(NEIGHBOURHOODS[neighbourhood.upper()])
+        if max(birth | survival, default=0) > n_neighbours or not 2 <= n_states <= 256:
+            return None
+        return cls(birth, survival, n_states, neighbourhood)
+
+    def step(self, cells):
+        """
+        cells (a 2D uint8 array of states) one generation on: dying cells
+        age, live ones survive or start dying and dead ones may be born, with
+        only live cells counted. Padded by a cell a side for new births.
+        """
+        height, width = cells.shape
+        padded = np.zeros((height + 4, width + 4), np.uint8)
+        padded[2:-2, 2:-2] = cells
+        alive = (padded == 1).view(np.uint8)
+        counts = np.zeros((height + 2, width + 2), np.uint8)
+        for dx, dy in self.offsets:
+            counts += alive[1 + dy:height + 3 + dy, 1 + dx:width + 3 + dx]
+        current = padded[1:-1, 1:-1]
+        # everything but the dead moves on a state, and the last dying state wraps round to dead...
+        out = current + (current > 0)
+        out[current == self.n_states - 1] = 0
+        # ...except live cells that survive, and dead cells can be born
+        out[(current == 1) & self.survival[counts]] = 1
+        out[(current == 0) & self.birth[counts]] = 1
+        return out
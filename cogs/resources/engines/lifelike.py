@@ -0,0 +1,69 @@
+"""
+Two-state outer-totalistic rules: B3/S23 and the like, in B/S or S/B
+notation, along with their hexagonal (H) and von Neumann (V) variants as
+Golly emulates them on the square grid.
+
+A generation is a handful of shifted slice additions to count every cell's
+neighbours in uint8, then one lookup into a (state, count) -> state table.
+"""
+import re
+
+import numpy as np
+
+# B3/S23, B3S23
+rBS = re.compile(r'B([0-8]*)/?S([0-8]*)([HV]?)', re.I)
+# 23/3 (survival first)
+rSB = re.compile(r'([0-8]*)/([0-8]*)([HV]?)', re.I)
+
+MOORE = [(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dx or dy]
+NEIGHBOURHOODS = {
+  '': MOORE,
+  # a hexagonal grid sheared onto the square one, so NE and SW aren't neighbours
+  'H': [(dx, dy) for dx, dy in MOORE if (dx, dy) not in ((1, -1), (-1, 1))],
+  'V': [(0, -1), (-1, 0), (1, 0), (0, 1)],
+}
+
+
+class LifeLike:
+    reach = 1
+
+    def __init__(self, birth, survival, neighbourhood=''):
+        """
+        birth, survival: Iterables of neighbour counts
+        neighbourhood: '' for Moore, 'H' for hexagonal or 'V' for von Neumann
+        """
+        self.offsets = NEIGHBOURHOODS[neighbourhood.upper()]
+        self.table = np.zeros((2, 9), np.uint8)
+        self.table[0, list(birth)] = 1
+        self.table[1, list(survival)] = 1
+
+    @classmethod
+    def from_rule(cls, rule):
+        """LifeLike for a B/S or S/B rulestring such as B3/S23, 23/3 or B2/S34H, or None for anything else"""
+        m = rBS.fullmatch(rule)
+        if m:
+            birth, survival, neighbourhood = m.groups()
+        else:
+            m = rSB.fullmatch(rule)
+            if not m:
+                return None
+            survival, birth, neighbourhood = m.groups()
+        birth, survival = set(map(int, birth)), set(map(int, survival))
+        n_neighbours = len(NEIGHBOURHOODS[neighbourhood.upper()])
+        if max(birth | survival, default=0) > n_neighbours:
+            return None
+        return cls(birth, survival, neighbourhood)
+
+    def step(self, cells):
+        """
+        cells (a 2D uint8 array of 0s and 1s) one generation on, with every
+        cell's neighbours counted over the rule's neighbourhood. Comes back a
+        cell bigger all round, for births just outside the input.
+        """
+        height, width = cells.shape
+        padded = np.zeros((height + 4, width + 4), np.uint8)
+        padded[2:-2, 2:-2] = cells
+        counts = np.zeros((height + 2, width + 2), np.uint8)
+        for dx, dy in self.offsets:
+            counts += padded[1 + dy:height + 3 + dy, 1 + dx:width + 3 + dx]
+        return self.table[padded[1:-1, 1:-1], counts]
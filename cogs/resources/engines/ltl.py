@@ -0,0 +1,110 @@
+"""
+Larger than Life rules (R5,C0,M1,S34..58,B34..45,NM and the like): ranges
+of live neighbour counts over a range-R Moore (NM) or von Neumann (NN)
+neighbourhood, with Generations-style dying states if C > 2.
+
+Counting up to (2R + 1)^2 neighbours cell by cell is what makes big ranges
+slow, so a generation takes one summed-area table (2D prefix sums) of the
+live cells and reads every cell's count off it with four lookups, whatever
+R is. The von Neumann diamond is a square on a grid rotated by 45 degrees
+(u = x + y, v = x - y), so it gets the same treatment there.
+"""
+import re
+
+import numpy as np
+
+rLTL = re.compile(r'R(\d{1,3}),C(\d{1,3}),M([01]),S(\d+)\.\.(\d+),B(\d+)\.\.(\d+),N([NM])', re.I)
+
+
+def _box(alive, r):
+    """
+    Sums of alive, a 2D uint8 array, over the (2R + 1)x(2R + 1) window
+    around each of its cells and every cell up to R outside it
+    """
+    height, width = alive.shape
+    sat = np.zeros((height + 1, width + 1), np.int32)
+    np.cumsum(alive, 0, np.int32, sat[1:, 1:])
+    np.cumsum(sat[1:, 1:], 1, out=sat[1:, 1:])
+    # windows hanging off alive's edges sum the same pulled in to them, which padding with edge values does
+    sat = np.pad(sat, 2 * r, 'edge')
+    return (
+      sat[2 * r + 1:, 2 * r + 1:] - sat[:height + 2 * r, 2 * r + 1:]
+      - sat[2 * r + 1:, :width + 2 * r] + sat[:height + 2 * r, :width + 2 * r]
+    )
+
+
+class LargerThanLife:
+    def __init__(self, radius, n_states, middle, survival, birth, neighbourhood='M'):
+        """
+        radius: R, 1 to 500
+        n_states: Total number of states, dead and alive included
+        middle: Whether a live cell counts itself as a neighbour
+        survival, birth: (min, max) live neighbour counts, inclusive
+        neighbourhood: 'M' for Moore or 'N' for von Neumann
+        """
+        self.reach = radius
+        self.n_states = n_states
+        self.middle = middle
+        self.survival = survival
+        self.birth = birth
+        self.neighbourhood = neighbourhood.upper()
+
+    @classmethod
+    def from_rule(cls, rule):
+        """LargerThanLife for an R,C,M,S,B,N rulestring of range 1 to 500 and at most 256 states, or None"""
+        m = rLTL.fullmatch(rule)
+        if not m:
+            return None
+        radius, n_states, middle, s_min, s_max, b_min, b_max, neighbourhood = m.groups()
+        radius, n_states = int(radius), int(n_states)
+        if not 1 <= radius <= 500 or n_states == 1 or n_states > 256:
+            return None
+        return cls(
+          # C0 is two states, same as C2
+          radius, max(n_states, 2), middle == '1',
+          (int(s_min), int(s_max)), (int(b_min), int(b_max)), neighbourhood
+        )
+
+    def counts(self, alive):
+        """
+        Live neighbours (the cell itself included) of every cell of alive, a
+        2D uint8 array of 0s and 1s, and of every cell up to R outside it
+        """
+        r = self.reach
+        if self.neighbourhood == 'M':
+            return _box(alive, r)
+        # u = x + y and v = x - y (offset to be nonnegative) take the diamond
+        # |dx| + |dy| <= R to the square |du|, |dv| <= R, with the cells
+        # not on the rotated lattice left dead
+        height, width = alive.shape
+        size = height + width - 1 + 2 * r
+        rotated = np.zeros((size, size), np.uint8)
+        y, x = np.nonzero(alive)
+        rotated[x + y + r, x - y + height - 1 + r] = 1
+        counts = _box(rotated, r)
+        y, x = np.ogrid[-r:height + r, -r:width + r]
+        return counts[x + y + 2 * r, x - y + height - 1 + 2 * r]
+
+    def step(self, cells):
+        """
+        cells (a 2D uint8 array of states) one generation on, reading each
+        cell's count off counts() whatever R is. The result takes in the R
+        cells around the input on every side, the whole neighbourhood's reach.
+        """
+        r = self.reach
+        height, width = cells.shape
+        current = np.zeros((height + 2 * r, width + 2 * r), np.uint8)
+        current[r:-r, r:-r] = cells
+        counts = self.counts((cells == 1).view(np.uint8))
+        if not self.middle:
+            counts -= current == 1
+        # as with Generations: everything but the dead moves on a state,
+        # and the last dying state (or a live cell, with only two states) wraps round to dead...
+        out = current + (current > 0)
+        out[current == self.n_states - 1] = 0
+        # ...except live cells that survive, and dead cells can be born
+        s_min, s_max = self.survival
+        b_min, b_max = self.birth
+        out[(current == 1) & (s_min <= counts) & (counts <= s_max)] = 1
+        out[(current == 0) & (b_min <= counts) & (counts <= b_max)] = 1
+        return out
@@ -0,0 +1,169 @@
+"""
+Sparse universes: a generation held as a dict of TILE x TILE arrays, so
+that spread-out patterns (big constructions, soups that have scattered
+gliders everywhere) cost memory and time by what's alive and changing
+rather than by the area of their bounding box.
+
+Only tiles with something alive in them are kept. A step recomputes just
+the tiles within reach of a cell that changed in the step before, since
+nothing else can have anything new to react to, and every other tile is
+carried over as the very same array. Generations in a row therefore share
+most of their tiles, which is also what keeps storing a whole sim cheap.
+"""
+import numpy as np
+
+TILE = 32
+EMPTY = np.zeros((TILE, TILE), np.uint8)
+EMPTY.flags.writeable = False
+
+
+def around(keys):
+    """keys, and the keys of every tile next to one of them"""
+    return {(tx + dx, ty + dy) for tx, ty in keys for dx in (-1, 0, 1) for dy in (-1, 0, 1)}
+
+
+def _extents(tiles):
+    """(x0, y0, x1, y1) of the live cells in each of a stack of nonempty tiles, relative to the tile"""
+    rows, cols = tiles.any(axis=2), tiles.any(axis=1)
+    return np.stack((
+      cols.argmax(axis=1), rows.argmax(axis=1),
+      TILE - 1 - cols[:, ::-1].argmax(axis=1), TILE - 1 - rows[:, ::-1].argmax(axis=1)
+    ), axis=1).tolist()
+
+
+class Tiles:
+    __slots__ = 'tiles', 'extents'
+
+    def __init__(self, tiles, extents=None):
+        """
+        tiles: {(tx, ty): TILE x TILE uint8 array of states} covering x in [tx * TILE, (tx + 1) * TILE) etc.
+        extents: {(tx, ty): where in it that tile's live cells are}, for as many tiles as are known
+        """
+        self.tiles = tiles
+        self.extents = {} if extents is None else extents
+
+    @classmethod
+    def from_cells(cls, xs, ys, states):
+        """From the coordinates and states of every live cell, e.g. from rle.coords()"""
+        tiles = {}
+        if not xs.size:
+            return cls(tiles)
+        keys, which = np.unique(np.stack((xs // TILE, ys // TILE), axis=1), axis=0, return_inverse=True)
+        order = np.argsort(which.ravel(), kind='stable')
+        bounds = np.searchsorted(which.ravel()[order], np.arange(len(keys) + 1))
+        for (tx, ty), start, stop in zip(keys.tolist(), bounds[:-1], bounds[1:]):
+            cells = order[start:stop]
+            tile = np.zeros((TILE, TILE), np.uint8)
+            tile[ys[cells] % TILE, xs[cells] % TILE] = states[cells]
+            tiles[tx, ty] = tile
+        return cls(tiles)
+
+    @classmethod
+    def from_array(cls, cells, pos):
+        """From a 2D array of states with its top left at pos"""
+        ys, xs = np.nonzero(cells)
+        return cls.from_cells(xs + pos[0], ys + pos[1], cells[ys, xs])
+
+    def bounds(self):
+        """(x, y, width, height) of the live cells' bounding box, or None if there aren't any"""
+        if not self.tiles:
+            return None
+        missing = [key for key in self.tiles if key not in self.extents]
+        if missing:
+            self.extents.update(zip(missing, _extents(np.stack([self.tiles[key] for key in missing]))))
+        (tx, ty), (x0, y0, x1, y1) = next(iter(self.extents.items()))
+        xmin, ymin, xmax, ymax = tx * TILE + x0, ty * TILE + y0, tx * TILE + x1, ty * TILE + y1
+        for (tx, ty), (x0, y0, x1, y1) in self.extents.items():
+            xmin, xmax = min(xmin, tx * TILE + x0), max(xmax, tx * TILE + x1)
+            ymin, ymax = min(ymin, ty * TILE + y0), max(ymax, ty * TILE + y1)
+        return xmin, ymin, xmax - xmin + 1, ymax - ymin + 1
+
+    def paint(self, frame, x, y):
+        """Draw the tiles that show onto frame, a 2D array whose top left is at (x, y)"""
+        height, width = frame.shape
+        for (tx, ty), tile in self.tiles.items():
+            left, top = tx * TILE - x, ty * TILE - y
+            if left >= width or top >= height or left <= -TILE or top <= -TILE:
+                continue
+            frame[max(top, 0):top + TILE, max(left, 0):left + TILE] = tile[max(-top, 0):height - top, max(-left, 0):width - left]
+
+    def to_array(self):
+        """(cells, (x, y)): the live cells as one 2D array of states cropped to them, and its top left"""
+        bounds = self.bounds()
+        if bounds is None:
+            return np.zeros((0, 0), np.uint8), (0, 0)
+        x, y, width, height = bounds
+        cells = np.zeros((height, width), np.uint8)
+        self.paint(cells, x, y)
+        return cells, (x, y)
+
+
+class Tiled:
+    def __init__(self, engine):
+        """engine: Any of ENGINES whose reach is at most TILE, to step each tile with"""
+        self.engine = engine
+        self.reach = r = engine.reach
+        # for each neighbour, where its part of a tile's window is in the window and in the neighbour
+        self.margins = []
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                left, top = r + dx * TILE, r + dy * TILE
+                x0, y0 = max(left, 0), max(top, 0)
+                x1, y1 = min(left + TILE, TILE + 2 * r), min(top + TILE, TILE + 2 * r)
+                self.margins.append((
+                  (dx, dy),
+                  (slice(y0, y1), slice(x0, x1)),
+                  (slice(y0 - top, y1 - top), slice(x0 - left, x1 - left))
+                ))
+
+    def window(self, tiles, key, out):
+        """Fill out with the tile at key and a reach-wide margin of its neighbours' cells around it"""
+        tx, ty = key
+        for (dx, dy), inside, part in self.margins:
+            tile = tiles.get((tx + dx, ty + dy))
+            if tile is not None:
+                out[inside] = tile[part]
+
+    def step(self, current, active):
+        """
+        (next generation, keys of the tiles that changed, keys of the tiles
+        to recompute next time) after current, a Tiles, recomputing only the
+        tiles at the keys in active.
+
+        The active tiles are stepped together: their windows laid side by
+        side in one row make a pattern whose every tile's cells only see
+        their own window, so the engine takes them all in one call.
+        """
+        r = self.reach
+        keys = list(active)
+        if not keys:
+            return current, set(), set()
+        size = TILE + 2 * r
+        row = np.zeros((size, len(keys) * size), np.uint8)
+        for i, key in enumerate(keys):
+            self.window(current.tiles, key, row[:, i * size:(i + 1) * size])
+        # the engine grows its input by reach, so each tile is 2 * reach in from its window's corner
+        stepped = self.engine.step(row)[2 * r:2 * r + TILE, r:r + len(keys) * size]
+        stepped = stepped.reshape(TILE, len(keys), size)[:, :, r:r + TILE].transpose(1, 0, 2)
+        old = np.stack([current.tiles.get(key, EMPTY) for key in keys])
+        diff = stepped != old
+        moved = diff.any(axis=(1, 2))
+        alive = stepped.any(axis=(1, 2))
+        tiles, extents = dict(current.tiles), dict(current.extents)
+        changed = {key for key, m in zip(keys, moved) if m}
+        for key, new, a in zip(keys, stepped, alive):
+            if key not in changed:
+                continue
+            extents.pop(key, None)
+            if a:
+                tiles[key] = np.ascontiguousarray(new)
+            else:
+                del tiles[key]
+        # only the neighbours that a change is within reach of have anything new to react to
+        next_active = set()
+        strips = (slice(None, r), slice(None), slice(-r, None))
+        for dy, rows in zip((-1, 0, 1), strips):
+            for dx, cols in zip((-1, 0, 1), strips):
+                reached = diff[:, rows, cols].any(axis=(1, 2))
+                next_active.update((tx + dx, ty + dy) for (tx, ty), hit in zip(keys, reached) if hit)
+        return Tiles(tiles, extents), changed, next_active
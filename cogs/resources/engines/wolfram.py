@@ -0,0 +1,58 @@
+"""
+Wolfram's elementary 1D rules (W30, W110...), which Golly emulates on the
+2D grid with each row below a pattern showing the generation after the row
+above it: a dead cell comes alive if the rule says the three cells above it
+give birth, and live cells never die. So a one-row pattern run to gen is its
+spacetime diagram, drawn a row at a time.
+
+Only even rules are allowed, as in Golly, since odd ones would have the
+empty background give birth.
+"""
+import re
+
+import numpy as np
+
+rW = re.compile(r'W(\d{1,3})', re.I)
+
+
+class Wolfram:
+    reach = 1
+
+    def __init__(self, number):
+        """number: Wolfram code, its bit n the new cell for a left-center-right neighbourhood of n"""
+        self.table = (number >> np.arange(8) & 1).astype(np.uint8)
+
+    @classmethod
+    def from_rule(cls, rule):
+        """Engine for rule, or None if rule isn't one this can run"""
+        m = rW.fullmatch(rule)
+        if not m or int(m[1]) > 254 or int(m[1]) % 2:
+            return None
+        return cls(int(m[1]))
+
+    def step(self, cells):
+        """
+        The generation after cells, a 2D uint8 array of 0s and 1s, as Golly
+        emulates it. The result is grown by a cell on every side.
+        """
+        height, width = cells.shape
+        padded = np.zeros((height + 3, width + 4), np.uint8)
+        padded[2:-1, 2:-2] = cells
+        above = padded[:-1, :-2] << 2 | padded[:-1, 1:-1] << 1 | padded[:-1, 2:]
+        return padded[1:, 1:-1] | self.table[above]
+
+    def spacetime(self, row, gen):
+        """
+        Generations 0 to gen of row, a 1D uint8 array of 0s and 1s, each the
+        row below the one before: what a one-row pattern looks like after
+        gen generations in Golly, with row's cells starting at column gen.
+        """
+        out = np.zeros((gen + 1, row.size + 2 * gen + 2), np.uint8)
+        # a dead column either side, so every neighbourhood can be sliced out
+        out[0, gen + 1:gen + 1 + row.size] = row
+        for t in range(gen):
+            # only the cells t + 1 or fewer away from row's can be alive by t + 1
+            lo, hi = gen - t, gen + row.size + t + 2
+            above = out[t]
+            out[t + 1, lo:hi] = self.table[above[lo - 1:hi - 1] << 2 | above[lo:hi] << 1 | above[lo + 1:hi + 1]]
+        return out[:, 1:-1]
@@ -0,0 +1,246 @@
+"""
+Animated GIF writer for frames that are already palette indices.
+
+Every frame shares one global color table built from the rule's colors, so
+nothing is ever quantized: frames go straight to LZW compression (borrowed
+from Pillow's C encoder) and are wrapped in GIF blocks written here.
+
+By default only the rectangle that changed since the previous frame is
+written, drawn over it in place, and runs of identical frames are collapsed
+into one frame shown for their combined duration.
+
+The writer counts every byte it writes, so it can hold output to a size
+budget: the first frame that won't fit (along with every frame after it) is
+dropped and the writer marks itself full, leaving a valid GIF that ends on
+a frame boundary.
+"""
+import io
+import struct
+
+import numpy as np
+from PIL import Image
+
+
+def _skip_blocks(data, pos):
+    """Index just past the chain of data sub-blocks starting at pos"""
+    while data[pos]:
+        pos += 1 + data[pos]
+    return pos + 1
+
+
+def _table_bits(n_colors):
+    """GIF color tables hold 2 ** (bits + 1) entries"""
+    return max(0, (max(n_colors, 2) - 1).bit_length() - 1)
+
+
+def lzw(frame, palette=b''):
+    """
+    LZW-compressed image data (code size byte and sub-blocks) for a
+    2D uint8 array of palette indices.
+    """
+    height, width = frame.shape
+    im = Image.frombytes('P', (width, height), np.ascontiguousarray(frame, np.uint8).tobytes())
+    if palette:
+        im.putpalette(palette)
+    buf = io.BytesIO()
+    im.save(buf, 'GIF', optimize=False, interlace=False)
+    data = buf.getbuffer()
+    # Skip header, logical screen descriptor and global color table...
+    pos = 13
+    if data[10] & 0x80:
+        pos += 3 << ((data[10] & 7) + 1)
+    # ...then any extensions...
+    while data[pos] == 0x21:
+        pos = _skip_blocks(data, pos + 2)
+    # ...then the image descriptor and its local color table
+    flags = data[pos + 9]
+    pos += 10
+    if flags & 0x80:
+        pos += 3 << ((flags & 7) + 1)
+    return bytes(data[pos:_skip_blocks(data, pos + 1)])
+
+
+# GIF delays are 16-bit
+MAX_DELAY = 0xFFFF
+
+
+def dirty_rect(prev, frame):
+    """
+    (left, top, right, bottom) of the smallest rectangle containing every
+    pixel that differs between two equally-shaped frames, or None if none do.
+    """
+    diff = prev != frame
+    rows = np.flatnonzero(diff.any(axis=1))
+    if not rows.size:
+        return None
+    cols = np.flatnonzero(diff[rows[0]:rows[-1] + 1].any(axis=0))
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def frame_size(prev, frame):
+    """
+    Bytes GifWriter would spend on frame if it followed prev (None if it's
+    the first), without writing anything. Identical frames cost nothing.
+    """
+    if prev is None:
+        return 18 + len(lzw(frame))
+    rect = dirty_rect(prev, frame)
+    if rect is None:
+        return 0
+    left, top, right, bottom = rect
+    # graphic control extension + image descriptor + image data
+    return 18 + len(lzw(frame[top:bottom, left:right]))
+
+
+class GifWriter:
+    def __init__(self, fp, size, palette, duration, *, loop=0, delta=True, budget=None):
+        """
+        fp: Binary file object to write to
+        size: (width, height) of every frame
+        palette: Sequence of up to 256 RGB triples; frame values index into it
+        duration: Seconds each frame is shown for
+        loop: Number of times to loop, 0 for forever
+        delta: Write only each frame's changed rectangle, and merge identical frames
+        budget: Max size of the finished GIF in bytes, or None for no limit
+                (the first frame is always written, even if it alone is over)
+        """
+        self.fp = fp
+        self.width, self.height = size
+        palette = np.asarray(palette, np.uint8).reshape(-1, 3)
+        bits = _table_bits(len(palette))
+        table = np.zeros((2 << bits, 3), np.uint8)
+        table[:len(palette)] = palette
+        self.palette = table.tobytes()
+        # GIF delays are in centiseconds, and most viewers slow anything under 2cs down to 10cs
+        self.delay = max(2, round(100 * duration))
+        self.delta = delta
+        self.budget = budget
+        self.full = False  # whether a frame has been dropped for not fitting the budget
+        self.closed = False
+        self.nbytes = 0
+        self.n_frames = 0  # frames actually written
+        self.n_kept = 0  # frames passed to append() that made it into the GIF, merged or not
+        # Last frame written, as the viewer will have it on screen
+        self._shown = None
+        # Frame held back in case the next ones are identical to it, its delay so far,
+        # and how many appended frames it stands for
+        self._pending = None
+        self._pending_delay = 0
+        self._pending_count = 0
+        self._emit(
+            b'GIF89a'
+            + struct.pack('<HHBBB', self.width, self.height, 0xF0 | bits, 0, 0)
+            + self.palette
+            # NETSCAPE2.0 looping extension
+            + b'\x21\xff\x0bNETSCAPE2.0\x03\x01' + struct.pack('<H', loop) + b'\x00'
+        )
+        self._header_size = self.nbytes
+
+    def append(self, frame):
+        """Add one (height, width) uint8 array of palette indices as the next frame"""
+        if self.full:
+            return
+        if not self.delta:
+            self.n_kept += self._write(frame, (0, 0), self.delay)
+            return
+        if (
+          self._pending is not None
+          and self._pending_delay + self.delay <= MAX_DELAY
+          and np.array_equal(frame, self._pending)
+        ):
+            self._pending_delay += self.delay
+            self._pending_count += 1
+            return
+        self.flush()
+        if self.full:
+            return
+        self._pending = np.array(frame, np.uint8)
+        self._pending_delay = self.delay
+        self._pending_count = 1
+
+    def flush(self):
+        """Write out the frame held back for merging, if any"""
+        frame, self._pending = self._pending, None
+        if frame is None:
+            return
+        rect = (0, 0, self.width, self.height) if self._shown is None else dirty_rect(self._shown, frame)
+        if rect is None:
+            # only reached when a merged frame's delay overflows: repeat one pixel to hold the picture
+            rect = 0, 0, 1, 1
+        left, top, right, bottom = rect
+        if self._write(frame[top:bottom, left:right], (left, top), self._pending_delay):
+            self._shown = frame
+            self.n_kept += self._pending_count
+
+    def extend(self, other):
+        """
+        Add every frame written to other, a writer for the same size, palette
+        and duration started separately (e.g. on a later stretch of the same
+        sim, in another process), after this one's. Its first frame is a full
+        one, so nothing of this writer's last frame carries over into it.
+
+        Either all of other's frames fit the budget or none are added and
+        this writer is marked full. Returns whether they were added.
+        Only works when other's fp is an io.BytesIO.
+        """
+        if self.full:
+            return False
+        self.flush()
+        other.flush()
+        blocks = other.fp.getvalue()[other._header_size:other.nbytes]
+        if self.budget is not None and self.nbytes + len(blocks) + 1 > self.budget:
+            self.full = True
+            return False
+        self._emit(blocks)
+        self.n_frames += other.n_frames
+        self.n_kept += other.n_kept
+        self._shown = other._shown
+        return True
+
+    def _write(self, frame, offset, delay):
+        """Write one image block, unless it would break the budget. Returns whether it was written"""
+        if self.full:
+            return False
+        height, width = frame.shape
+        block = (
+            # graphic control extension: leave previous frame in place, no transparency
+            b'\x21\xf9\x04\x04' + struct.pack('<H', delay) + b'\x00\x00'
+            # image descriptor: no local color table, not interlaced
+            + b'\x2c' + struct.pack('<HHHHB', *offset, width, height, 0)
+            + lzw(frame, self.palette)
+        )
+        # leave room for the trailer
+        if self.budget is not None and self.n_frames and self.nbytes + len(block) + 1 > self.budget:
+            self.full = True
+            return False
+        self._emit(block)
+        self.n_frames += 1
+        return True
+
+    def _emit(self, data):
+        self.fp.write(data)
+        self.nbytes += len(data)
+
+    def getvalue(self):
+        """
+        The GIF so far, finished off with a trailer. Unless the writer has been
+        closed it stays open, so more frames can be appended to it afterward.
+        Only works when fp is an io.BytesIO.
+        """
+        if self.closed:
+            return self.fp.getvalue()
+        self.flush()
+        return self.fp.getvalue() + b'\x3b'
+
+    def close(self):
+        if self.closed:
+            return
+        self.flush()
+        self._emit(b'\x3b')
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -0,0 +1,103 @@
+"""
+Index of what was recently posted in each channel.
+
+Commands that fall back on "the last pattern/rule someone posted" used to
+page through channel.history(limit=50) for it, one REST call per lookup.
+The bot instead feeds every message it sees into a MessageIndex, which
+keeps the last `depth` messages of each channel, each reduced to the
+matches of whatever kinds of thing cogs have asked it to track (an RLE, a
+rulestring...). A lookup is then a walk over at most `depth` small dicts.
+
+Edits re-match a message and deletes drop it. A channel's history is only
+fetched the first time it's looked up without having been backfilled,
+i.e. after a restart, when the index hasn't seen its older messages.
+"""
+from collections import OrderedDict, deque
+
+
+class Entry:
+    __slots__ = 'id', 'author', 'matches'
+
+    def __init__(self, id, author, matches):
+        self.id = id
+        self.author = author
+        self.matches = matches
+
+
+class MessageIndex:
+    def __init__(self, depth=50, max_channels=1000):
+        """
+        depth: Messages to remember per channel (same as the history limit it replaces)
+        max_channels: Channels to remember before forgetting the least recently active
+        """
+        self.depth = depth
+        self.max_channels = max_channels
+        self.kinds = {}
+        self._channels = OrderedDict()
+        self._backfilled = set()
+
+    def track(self, kind, search):
+        """
+        Start indexing kind, where search(content) returns a re.Match or
+        None. Only messages seen from now on are checked for it.
+        """
+        self.kinds[kind] = search
+
+    def _entry(self, id, author, content):
+        matches = {}
+        for kind, search in self.kinds.items():
+            m = search(content)
+            if m:
+                matches[kind] = m
+        return Entry(id, author, matches)
+
+    def _channel(self, channel_id):
+        try:
+            self._channels.move_to_end(channel_id)
+        except KeyError:
+            self._channels[channel_id] = deque(maxlen=self.depth)
+            if len(self._channels) > self.max_channels:
+                forgotten, _ = self._channels.popitem(last=False)
+                self._backfilled.discard(forgotten)
+        return self._channels[channel_id]
+
+    def add(self, message):
+        self._channel(message.channel.id).append(self._entry(message.id, message.author, message.content))
+
+    def edit(self, channel_id, message_id, content):
+        for i, entry in enumerate(self._channels.get(channel_id, ())):
+            if entry.id == message_id:
+                self._channels[channel_id][i] = self._entry(entry.id, entry.author, content)
+                return
+
+    def delete(self, channel_id, message_ids):
+        entries = self._channels.get(channel_id)
+        if entries:
+            message_ids = set(message_ids)
+            kept = [entry for entry in entries if entry.id not in message_ids]
+            entries.clear()
+            entries.extend(kept)
+
+    async def backfill(self, channel):
+        """Load channel's recent history, merging it with what's been seen since"""
+        fetched = [self._entry(msg.id, msg.author, msg.content) async for msg in channel.history(limit=self.depth)]
+        entries = self._channel(channel.id)
+        # messages might have come in or been deleted while fetching; snowflakes sort by time
+        merged = {entry.id: entry for entry in fetched}
+        merged.update((entry.id, entry) for entry in entries)
+        entries.clear()
+        entries.extend(merged[id] for id in sorted(merged)[-self.depth:])
+        self._backfilled.add(channel.id)
+
+    async def latest(self, channel, kind):
+        """
+        (match, author) of the most recent message in channel that matched
+        kind, or (None, None) if none of the last `depth` did.
+        """
+        if channel.id not in self._backfilled:
+            await self.backfill(channel)
+        for entry in reversed(self._channels[channel.id]):
+            m = entry.matches.get(kind)
+            if m:
+                return m, entry.author
+        return None, None
@@ -39,29 +39,52 @@ def typecasted(func):
 
 import asyncio
 import concurrent.futures
+from collections import namedtuple
 
-async def await_event_or_coro(bot, event, coro, *, ret_check=None, event_check=None, timeout=None):
+# Outcome of race_event(): winner is 'event' or 'coro', and value is either
+# what wait_for would have returned for the event or the coroutine's return value
+Race = namedtuple('Race', 'winner value')
+
+
+async def race_event(bot, event, coro, *, check=None, timeout=None):
     """
     discord.Client.wait_for, but force-cancels on completion of
-    :param:coro rather than on a timeout
+    :param:coro rather than on a timeout. Whichever of the two loses is
+    cancelled and waited on, and the event listener is removed either way.
+
+    check: Predicate on the event's arguments, as with wait_for
+    timeout: Seconds after which both are cancelled and asyncio.TimeoutError raised
+
+    Returns a Race. If coro raises, so does this.
     """
+    # start coro first so that it's never left unawaited
+    task = asyncio.ensure_future(coro)
     future = bot.loop.create_future()
-    event_check = event_check or (lambda *_, **__: True)
-    try:
-        listeners = bot._listeners[event.lower()]
-    except KeyError:
-        listeners = []
-        bot._listeners[event.lower()] = listeners
-    listeners.append((future, event_check))
-    [done], pending = await asyncio.wait([future, coro], timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
-    for task in pending:
-        task.cancel() # does this even do anything???
+    listener = future, check or (lambda *_: True)
+    event = event.lower()
+    listeners = bot._listeners.setdefault(event, [])
+    listeners.append(listener)
     try:
-        which = 'event' if event_check(*done.result()) else 'coro'
-    except TypeError:
-        which = 'coro'
-    return {which: done.result()}
-    
+        done, _ = await asyncio.wait([future, task], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # dispatch drops listeners as it resolves them, so it may be gone already
+        try:
+            listeners.remove(listener)
+        except ValueError:
+            pass
+        if not listeners and bot._listeners.get(event) is listeners:
+            del bot._listeners[event]
+        future.cancel()
+        if not task.done():
+            task.cancel()
+            # let it clean up after itself before we carry on
+            await asyncio.wait([task])
+    if not done:
+        raise asyncio.TimeoutError
+    if task in done:
+        return Race('coro', task.result())
+    return Race('event', future.result())
+
 
 async def wait_for_any(ctx, events, checks, *, timeout=15.0):
     """
@@ -86,6 +109,41 @@ async def wait_for_any(ctx, events, checks, *, timeout=15.0):
             return {event: result}
     return None
 
+
+async def run_process(*args, timeout=None, limit=None):
+    """
+    Run a program as an asyncio subprocess and capture its stdout/stderr
+    without blocking the event loop.
+
+    args: Program and its arguments (not passed through a shell)
+    timeout: Seconds after which the process is killed and asyncio.TimeoutError raised
+    limit: Optional asyncio.Semaphore bounding how many processes run at once
+
+    Returns (returncode, stdout, stderr) with both streams decoded.
+    The process is also killed if this is cancelled.
+    """
+    if limit is None:
+        return await _run_process(args, timeout)
+    async with limit:
+        return await _run_process(args, timeout)
+
+
+async def _run_process(args, timeout):
+    proc = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        if proc.returncode is None:
+            proc.kill()
+        # reap it even if whatever's cancelling us gets impatient
+        await asyncio.shield(proc.wait())
+        raise
+    return proc.returncode, out.decode('utf-8', 'replace'), err.decode('utf-8', 'replace')
+
 # ----------------------------------------------------------------------------------- #
 import re
 
@@ -479,7 +537,7 @@ def flatten_range_list(li):
     return {t for s in li for t in ([int(s)] if s.isnumeric() else parse_nutshell_range(s))}
 
 
-def get_rule_from_wiki(rulename, session):
+async def get_rule_from_wiki(rulename, session):
     async with session.get(
             f'https://conwaylife.com/w/api.php?action=parse&format=json&prop=wikitext&page=RULE:{rulename}'
     ) as resp:
@@ -0,0 +1,47 @@
+"""
+Frame scaling and grid overlay for the sim renderer, and still images.
+
+Frames are 2D uint8 arrays of palette indices. Upscaling is done as one
+copy out of a broadcast (strided) view, and grid lines are drawn by slice
+assignment, so cost is a handful of NumPy calls per frame whatever its size.
+"""
+import io
+
+import numpy as np
+import png
+
+
+def upscale(frame, mul, grid=None):
+    """
+    Blow each cell of frame up into a mul*mul block. If grid is given, the
+    first row and column of every block are set to it instead, outlining
+    cells the same way mutils.scale(..., grid=grid) does; as there, no grid
+    is drawn when mul == 1.
+    """
+    if mul == 1:
+        return frame
+    height, width = frame.shape
+    out = np.broadcast_to(frame[:, None, :, None], (height, mul, width, mul)).reshape(height * mul, width * mul)
+    if grid is not None:
+        out[::mul] = grid
+        out[:, ::mul] = grid
+    return out
+
+
+def to_png(frame, palette):
+    """
+    A frame as PNG bytes, with palette (RGB rows, one per index) as its
+    color table. Pixels are packed at the fewest bits per pixel that fit
+    the palette, so a two-color image takes one bit a pixel before zlib.
+    """
+    height, width = frame.shape
+    bitdepth = next(bits for bits in (1, 2, 4, 8) if len(palette) <= 1 << bits)
+    per_byte = 8 // bitdepth
+    padded = np.zeros((height, -(-width // per_byte) * per_byte), np.uint8)
+    padded[:, :width] = frame
+    shifts = bitdepth * np.arange(per_byte - 1, -1, -1, dtype=np.uint8)
+    packed = (padded.reshape(height, -1, per_byte) << shifts).sum(axis=2, dtype=np.uint8)
+    buf = io.BytesIO()
+    writer = png.Writer(width, height, palette=[tuple(color) for color in palette.tolist()], bitdepth=bitdepth)
+    writer.write_packed(buf, packed)
+    return buf.getvalue()
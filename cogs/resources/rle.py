@@ -0,0 +1,288 @@
+"""
+RLE codec shared by the sim pipeline.
+
+Decodes Golly-style RLE (two-state `b`/`o` and multistate `.`, `A`-`X`,
+`pA`-`yO`) straight into NumPy uint8 arrays of state indices, and encodes
+such arrays back. Decoding tokenizes the RLE once and then lays every run
+down with NumPy, so cost scales with the number of runs rather than cells.
+"""
+import re
+
+import numpy as np
+
+# one RLE token: optional run count, then a state or a row/pattern terminator
+rTOKENS = re.compile(r'(\d*)([$!]|[p-y][A-X]|[ob.A-X])')
+
+# `x = 12, y = 5, rule = B3/S23`
+rHEADER = re.compile(r'x\s*=\s*(-?\d+)\s*,\s*y\s*=\s*(-?\d+)(?:\s*,\s*rule\s*=\s*([^\n]+))?', re.I)
+
+# `#CXRLE Pos=-3,10`
+rPOS = re.compile(r'#CXRLE.*?Pos\s*=\s*(-?\d+)\s*,\s*(-?\d+)', re.I)
+
+# rTOKENS.sub() leaves only these behind in valid RLE
+rLEFTOVER = re.compile(r'[^\s]')
+
+NEWLINE = -1
+END = -2
+
+
+def token(state, two_state=False):
+    """State index -> RLE token"""
+    if two_state:
+        return 'bo'[state]
+    if state == 0:
+        return '.'
+    if state <= 24:
+        return chr(64 + state)
+    return chr(111 + (state - 1) // 24) + chr(65 + (state - 1) % 24)
+
+
+STATES = {
+  **{token(i): i for i in range(256)},
+  'b': 0,
+  'o': 1,
+  '$': NEWLINE,
+  '!': END
+  }
+TOKENS = [token(i) for i in range(256)]
+
+
+def split(text):
+    """
+    Split full RLE text into (header, body), where header is a dict
+    with keys 'x', 'y', 'rule' and 'pos' (any of which may be None).
+    """
+    header = {'x': None, 'y': None, 'rule': None, 'pos': None}
+    body = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.startswith('#'):
+            m = rPOS.match(stripped)
+            if m:
+                header['pos'] = int(m[1]), int(m[2])
+            continue
+        m = not body and rHEADER.match(stripped)
+        if m:
+            header['x'], header['y'] = int(m[1]), int(m[2])
+            header['rule'] = m[3] and ''.join(m[3].split())
+            continue
+        body.append(stripped)
+    return header, ''.join(body)
+
+
+# byte -> state index for single-character tokens
+_CHARS = np.zeros(256, np.int64)
+_CHARS[[ord('b'), ord('.')]] = 0
+_CHARS[ord('o')] = 1
+_CHARS[65:89] = np.arange(1, 25)
+_CHARS[ord('$')] = NEWLINE
+_POWERS = 10.0 ** np.arange(20)
+
+
+def runs(body):
+    """
+    Tokenize an RLE body up to its `!` into parallel arrays
+    (counts, states), where state NEWLINE stands for `$`.
+    """
+    chars = np.frombuffer(body.encode(), np.uint8)
+    chars = chars[chars > 32]
+    end = np.flatnonzero(chars == ord('!'))
+    if end.size:
+        chars = chars[:end[0]]
+    is_digit = (chars >= 48) & (chars <= 57)
+    is_prefix = (chars >= ord('p')) & (chars <= ord('y'))
+    # every token ends on its first char that's neither a digit nor a pA-yO prefix
+    ends = np.flatnonzero(~is_digit & ~is_prefix)
+    states = _CHARS[chars[ends]]
+    prefixed = np.flatnonzero(ends > 0)
+    prefixed = prefixed[is_prefix[ends[prefixed] - 1]]
+    states[prefixed] += 24 * (chars[ends[prefixed] - 1].astype(np.int64) - 111)
+
+    # run counts: each digit weighted by its place value within its token
+    token_of = np.cumsum(np.concatenate(([0], ~is_digit[:-1] & ~is_prefix[:-1])))
+    digits = np.flatnonzero(is_digit)
+    digits = digits[token_of[digits] < ends.size]
+    counts = np.ones(ends.size, np.int64)
+    if digits.size:
+        owner = token_of[digits]
+        n_digits = np.bincount(owner, minlength=ends.size)
+        first = np.concatenate(([0], ends[:-1] + 1))
+        place = n_digits[owner] - 1 - (digits - first[owner])
+        value = np.bincount(owner, (chars[digits] - 48) * _POWERS[place], ends.size)
+        counts = np.where(n_digits > 0, value.astype(np.int64), 1)
+    return counts, states
+
+
+def decode(body, width=0, height=0):
+    """
+    Decode an RLE body into a (height, width) uint8 array of states.
+    Given dimensions are grown if the pattern doesn't fit inside them.
+    """
+    counts, states = runs(body)
+    is_cell = states != NEWLINE
+    last = np.flatnonzero(is_cell)
+    if not last.size:
+        return np.zeros((height, width), np.uint8)
+    # `$`s after the last run can't add anything
+    counts, states, is_cell = counts[:last[-1] + 1], states[:last[-1] + 1], is_cell[:last[-1] + 1]
+    lengths = np.where(is_cell, counts, 0)
+    # cells laid down in the current row as of the end of each token
+    ends = np.cumsum(lengths)
+    row_starts = np.maximum.accumulate(np.where(is_cell, 0, ends))
+    row_ends = ends - np.concatenate(([0], row_starts[:-1]))
+    width = max(width, int(row_ends.max()))
+    height = max(height, 1 + int(np.where(is_cell, 0, counts).sum()))
+    # Turn each run of `$`s into a run of background long enough to reach the
+    # next row's first cell, so that one np.repeat() lays down the whole pattern
+    lengths = np.where(is_cell, counts, width - row_ends + width * (counts - 1))
+    lengths = np.append(lengths, height * width - lengths.sum())
+    states = np.append(np.where(is_cell, states, 0), 0)
+    return np.repeat(states.astype(np.uint8), lengths).reshape(height, width)
+
+
+def coords(body):
+    """
+    (xs, ys, states) of every live (non-background) cell in an RLE body,
+    relative to its top left, without decoding it into an array the size
+    of its bounding box: cost scales with runs and population instead.
+    """
+    counts, states = runs(body)
+    is_cell = states != NEWLINE
+    lengths = np.where(is_cell, counts, 0)
+    # where each run starts within its row, as in decode()
+    ends = np.cumsum(lengths)
+    row_starts = np.maximum.accumulate(np.where(is_cell, 0, ends))
+    starts = ends - lengths - np.concatenate(([0], row_starts[:-1]))
+    rows = np.cumsum(np.where(is_cell, 0, counts))
+    live = is_cell & (states > 0)
+    counts, starts, rows, states = counts[live], starts[live], rows[live], states[live]
+    # each cell's place within its run
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + offsets, np.repeat(rows, counts), np.repeat(states, counts).astype(np.uint8)
+
+
+def read(text):
+    """Decode full RLE text into (cells, rule, pos)"""
+    header, body = split(text)
+    return decode(body, header['x'] or 0, header['y'] or 0), header['rule'], header['pos']
+
+
+def population(body, state=None):
+    """
+    Count live cells in an RLE body without decoding it, optionally
+    only those of one particular state.
+    """
+    counts, states = runs(body)
+    return int(counts[states > 0 if state is None else states == state].sum())
+
+
+def validate(text, n_states=None):
+    """
+    Raise ValueError if text (an RLE body, optionally with its header and
+    comment lines) isn't valid RLE or uses states beyond n_states.
+    """
+    _, body = split(text)
+    body = body.split('!', 1)[0]
+    junk = rLEFTOVER.search(rTOKENS.sub('', body))
+    if junk:
+        raise ValueError(f'Invalid character {junk[0]!r} in RLE')
+    if n_states is not None:
+        _, states = runs(body)
+        top = int(states.max(initial=0))
+        if top >= max(n_states, 2):
+            raise ValueError(f'RLE uses state {top}, but rule only has {n_states} states')
+
+
+def _row(row, names):
+    nonzero = np.flatnonzero(row)
+    if not nonzero.size:
+        return []
+    row = row[:nonzero[-1] + 1]
+    starts = np.flatnonzero(np.diff(row)) + 1
+    starts = np.concatenate(([0], starts))
+    lengths = np.diff(np.concatenate((starts, [row.size])))
+    return [f'{n}{names[v]}' if n > 1 else names[v] for n, v in zip(lengths.tolist(), row[starts].tolist())]
+
+
+def encode(cells, two_state=None, *, width=70):
+    """
+    Encode a 2D array of states as an RLE body (no header),
+    wrapped to `width` characters per line.
+    """
+    cells = np.asarray(cells, np.uint8)
+    if two_state is None:
+        two_state = cells.max(initial=0) < 2
+    names = 'bo' if two_state else TOKENS
+    tokens = []
+    blank = 0
+    for row in cells:
+        row_tokens = _row(row, names)
+        if not row_tokens:
+            blank += 1
+            continue
+        if tokens:
+            tokens.append(f'{blank + 1}$' if blank else '$')
+        elif blank:
+            # leading blank rows
+            tokens.append(f'{blank}$' if blank > 1 else '$')
+        tokens.extend(row_tokens)
+        blank = 0
+    tokens.append('!')
+    lines, line = [], ''
+    for tok in tokens:
+        if len(line) + len(tok) > width:
+            lines.append(line)
+            line = ''
+        line += tok
+    lines.append(line)
+    return '\n'.join(lines)
+
+
+def dump(cells, rule, pos=None, two_state=None):
+    """Encode a 2D array of states as full RLE text, header included"""
+    cells = np.asarray(cells, np.uint8)
+    height, width = cells.shape
+    return (
+      (f'#CXRLE Pos={pos[0]},{pos[1]}\n' if pos is not None else '')
+      + f'x = {width}, y = {height}, rule = {rule}\n'
+      + encode(cells, two_state)
+      + '\n'
+    )
+
+
+def crop(cells):
+    """Trim background off every edge, returning (cells, (dx, dy))"""
+    ys, xs = np.nonzero(cells)
+    if not ys.size:
+        return cells[:0, :0], (0, 0)
+    top, left = int(ys.min()), int(xs.min())
+    return cells[top:ys.max() + 1, left:xs.max() + 1], (left, top)
+
+
+def normalize(text, two_state=None):
+    """
+    Canonical form of an RLE body or full RLE text: cropped to its
+    bounding box and re-encoded, so that equivalent patterns compare equal.
+    """
+    _, body = split(text)
+    cells, _ = crop(decode(body))
+    return encode(cells, two_state)
+
+
+def palette(colors, bg, fallback=(255, 255, 255)):
+    """
+    (256, 3) uint8 lookup table from state index to RGB, built from
+    a token -> color dict like the ones from mutils.colorpatch().
+    """
+    lut = np.empty((256, 3), np.uint8)
+    lut[:] = fallback
+    for state in range(1, 256):
+        color = colors.get(TOKENS[state])
+        if state == 1:
+            color = colors.get('o', color)
+        if color is not None:
+            lut[state] = color
+    lut[0] = bg
+    return lut
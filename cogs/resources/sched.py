@@ -0,0 +1,202 @@
+"""
+Admission control for sims.
+
+Every sim takes a Job from the Scheduler before it may start bgolly and the
+renderer. Up to `slots` jobs run at once; the rest wait in a bounded queue
+ordered so that users and guilds that already have sims running go last,
+cheap sims go before expensive ones, and nothing waits forever (a job's cost
+class decays the longer it has been queued).
+
+Identical sims requested while one is already queued or running don't get
+a Job of their own: they join its Flight and share its result.
+"""
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from itertools import count
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    __slots__ = 'user', 'guild', 'cost', 'seq', 'queued_at', 'moved'
+
+    def __init__(self, user, guild, cost, seq):
+        self.user = user
+        self.guild = guild
+        self.cost = cost
+        self.seq = seq
+        self.queued_at = time.monotonic()
+        self.moved = asyncio.Event()
+
+
+def estimate_cost(gen, step, pat):
+    """
+    Relative cost of a sim: frames to render plus generations to simulate,
+    scaled by the size of the pattern's RLE. Only meaningful compared to
+    other estimates.
+    """
+    frames = 1 + gen // step
+    return (frames + gen / 100) * math.log2(2 + len(pat))
+
+
+class Scheduler:
+    def __init__(self, slots, maxsize=16, *, per_user=2, aging=30.0):
+        """
+        slots: Number of sims allowed to run at once
+        maxsize: Max number of sims allowed to wait in the queue
+        per_user: Max number of queued + running sims per user
+        aging: Seconds of waiting after which a job's cost class drops by one
+        """
+        self.slots = slots
+        self.maxsize = maxsize
+        self.per_user = per_user
+        self.aging = aging
+        self.queue = []
+        self.running = set()
+        self._seq = count()
+
+    def __len__(self):
+        return len(self.queue)
+
+    def _key(self, job, now):
+        user_load = sum(j.user == job.user for j in self.running)
+        guild_load = sum(j.guild == job.guild for j in self.running)
+        cost_class = max(0, int(math.log2(1 + job.cost)) - int((now - job.queued_at) / self.aging))
+        return user_load, guild_load, cost_class, job.seq
+
+    def order(self):
+        now = time.monotonic()
+        return sorted(self.queue, key=lambda job: self._key(job, now))
+
+    def position(self, job):
+        """1-based position of job in the queue, or 0 if it is running (or gone)"""
+        try:
+            return 1 + self.order().index(job)
+        except ValueError:
+            return 0
+
+    def submit(self, user, guild, cost):
+        if len(self.queue) >= self.maxsize:
+            raise QueueFull(f'Sim queue is full ({self.maxsize} waiting). Try again in a bit')
+        if sum(j.user == user for j in (*self.queue, *self.running)) >= self.per_user:
+            raise QueueFull(f'You already have {self.per_user} sims queued or running')
+        job = Job(user, guild, cost, next(self._seq))
+        self.queue.append(job)
+        return job
+
+    def release(self, job):
+        if job in self.queue:
+            self.queue.remove(job)
+        self.running.discard(job)
+        self._dispatch()
+
+    def _dispatch(self):
+        now = time.monotonic()
+        while self.queue and len(self.running) < self.slots:
+            job = min(self.queue, key=lambda j: self._key(j, now))
+            self.queue.remove(job)
+            self.running.add(job)
+            job.moved.set()
+        for job in self.queue:
+            job.moved.set()
+
+    @asynccontextmanager
+    async def turn(self, job, on_move=None):
+        """
+        Wait until job may run, awaiting on_move(position) whenever its queue
+        position changes (and on_move(0) once it leaves the queue), then hold
+        its slot for the duration of the block.
+        """
+        self._dispatch()
+        try:
+            last = None
+            while job not in self.running:
+                job.moved.clear()
+                position = self.position(job)
+                if on_move is not None and position != last:
+                    await on_move(position)
+                last = position
+                await job.moved.wait()
+            if on_move is not None and last is not None:
+                await on_move(0)
+            yield job
+        finally:
+            self.release(job)
+
+
+class Flight:
+    """
+    One run of a sim, shared by every identical request made while it's in
+    progress. The run is only cancelled once everybody waiting on it has
+    given up.
+    """
+    __slots__ = 'job', 'task', 'refs', 'listeners', 'logs', 'claimed', 'abandoned', 'choice'
+
+    def __init__(self, job):
+        self.job = job
+        self.task = None
+        self.refs = 0
+        self.listeners = []  # on_move callbacks, see Scheduler.turn()
+        self.logs = []  # anything with a .status to update once the run starts
+        self.claimed = False  # for whoever's first to take something only one waiter can have
+        self.abandoned = False
+        self.choice = None  # (algo, reason) if one was picked for the run, for late joiners' logs
+
+    async def on_move(self, position):
+        """Pass a queue position on to every waiter's on_move"""
+        for listener in list(self.listeners):
+            await listener(position)
+
+    def join(self, on_move=None, log=None):
+        """
+        Wait on the run along with everyone else: returns a coroutine that
+        resolves to its result. Cancelling that coroutine only cancels the
+        run if nobody else is still waiting on it.
+        """
+        self.refs += 1
+        if on_move is not None:
+            self.listeners.append(on_move)
+        if log is not None:
+            self.logs.append(log)
+        return self._wait(on_move, log)
+
+    async def _wait(self, on_move, log):
+        try:
+            return await asyncio.shield(self.task)
+        finally:
+            self.refs -= 1
+            if on_move is not None:
+                self.listeners.remove(on_move)
+            if log is not None:
+                self.logs.remove(log)
+            if not self.refs and not self.task.done():
+                self.abandoned = True
+                self.task.cancel()
+
+
+class Flights:
+    def __init__(self):
+        self._flights = {}
+
+    def get(self, key):
+        """Flight for key that's still worth joining, if any"""
+        flight = self._flights.get(key)
+        if flight is None or flight.abandoned or flight.task.done():
+            return None
+        return flight
+
+    def start(self, key, job, factory):
+        """
+        Begin a Flight running factory(flight), which should return a coroutine.
+        It can be joined by key until it finishes, unless key is None.
+        """
+        flight = Flight(job)
+        flight.task = asyncio.ensure_future(factory(flight))
+        if key is not None:
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._flights.get(key) is flight and self._flights.pop(key))
+        return flight
@@ -0,0 +1,106 @@
+"""
+On-disk cache of finished sims.
+
+Entries are content-addressed: the key is a hash of everything that decides
+what a sim's GIF looks like, with the pattern normalized first so that the
+same pattern posted at a different offset or with different line breaks
+hits the same entry. Each entry is the GIF itself plus a little JSON with
+how makeframes() cut it down (if it did) and the URL it was last uploaded
+to. The cache is held under a size cap by evicting the least recently used
+entries, recency being tracked by file mtimes.
+"""
+import hashlib
+import json
+import os
+
+from cogs.resources import rle
+
+
+def key(pat, rule, algo, gen, step, track, grid, colors, bg, truncate, *, normalized=None, rulefile=None):
+    """
+    Hex digest identifying a sim by everything that goes into its GIF.
+    normalized: rle.normalize(pat), if it's already been worked out
+    rulefile: The rule file's contents, for rules that have one, since the
+      same name can come to mean a different rule (re-uploaded, edited on the wiki)
+    """
+    header, _ = rle.split(pat)
+    params = {
+      'pat': rle.normalize(pat) if normalized is None else normalized,
+      # a pattern's own header can override the rule it's simmed in
+      'rule': header['rule'] or rule,
+      'algo': algo,
+      'gen': gen,
+      'step': step,
+      'track': track,
+      'grid': grid,
+      'colors': sorted((k, list(v)) for k, v in colors.items()),
+      'bg': list(bg),
+      'truncate': truncate,
+      'rulefile': rulefile and hashlib.sha256(rulefile).hexdigest(),
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+class SimCache:
+    def __init__(self, path, max_bytes):
+        """
+        path: Directory to keep entries in (created if need be)
+        max_bytes: Total size of GIFs to keep before evicting old ones
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+    def _paths(self, key):
+        return os.path.join(self.path, f'{key}.gif'), os.path.join(self.path, f'{key}.json')
+
+    def get(self, key):
+        """(gif bytes, metadata dict) for key, or None if it isn't cached"""
+        gif_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(gif_path, 'rb') as f:
+                data = f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+        # mark as recently used
+        os.utime(gif_path)
+        return data, meta
+
+    def put(self, key, data, **meta):
+        gif_path, meta_path = self._paths(key)
+        with open(gif_path, 'wb') as f:
+            f.write(data)
+        with open(meta_path, 'w') as f:
+            json.dump({'url': None, **meta}, f)
+        self._evict()
+
+    def set_url(self, key, url):
+        """Remember where key's GIF was uploaded, if it's still cached"""
+        _, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        meta['url'] = url
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.gif'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.name[:-4]))
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
@@ -0,0 +1,134 @@
+"""
+The in-process engines against bgolly, generation by generation: position,
+size and cells all have to come out the same as in bgolly's output for a
+handful of rules and patterns, stored in tests/data/engines. Each stored
+output starts with generation 0, which is also the pattern to run.
+
+Run from the repo root: python -m pytest tests
+To write the stored outputs again (needs the bgolly binary in cogs/resources):
+python -m tests.test_engines
+"""
+import os
+import subprocess
+import tempfile
+
+import numpy as np
+import pytest
+
+from cogs.resources import engines, rle
+
+DATA = os.path.join(os.path.dirname(__file__), 'data', 'engines')
+BGOLLY = os.path.join(os.path.dirname(__file__), '..', 'cogs', 'resources', 'bgolly')
+
+# name: (rule, gen, step)
+CASES = {
+  'life': ('B3/S23', 60, 1),
+  'highlife-step-3': ('B36/S23', 60, 3),
+  'hex': ('B2/S34H', 40, 1),
+  'von-neumann': ('B2/S013V', 40, 1),
+  'isotropic': ('B2-a3/S23-q', 40, 1),
+  'survival-first': ('2-a3/3', 40, 1),
+  # random, so neither totalistic nor isotropic, and any neighbour read from the wrong cell shows
+  'map-moore': (
+    'MAPObv7Vo0IOT7RBSescOPzkrW3eCchLUXAUKydRVKIg5XZP06dZoFuSpEBflJm1n494e7RKmHDg540aMfiVsO1aA', 20, 1
+  ),
+  'map-hex': ('MAPTV2uv6oQI6JzIDPfUGsiIA', 20, 1),
+  'map-hex-2': ('MAPEiRhruMXWNhw7cfgNrF8QQ', 20, 1),
+  'map-von-neumann': ('MAPeuZJNQ', 20, 1),
+  # Generations, starting with some cells already dying
+  'star-wars': ('345/2/4', 60, 1),
+  'generations-step-2': ('3467/2/6', 40, 2),
+  'generations-many-states': ('0123/3/200', 40, 1),
+  'generations-no-survival': ('/2/3', 40, 1),
+  'generations-hex': ('345/2/4H', 40, 1),
+  'generations-von-neumann': ('12/34/3V', 40, 1),
+}
+
+
+def soup(size, density, seed, n_states=2):
+    """A random pattern, with live cells in any of n_states - 1 states"""
+    rng = np.random.default_rng(seed)
+    alive = rng.random((size, size)) < density
+    return np.where(alive, rng.integers(1, n_states, (size, size)), 0).astype(np.uint8)
+
+
+def read_output(path):
+    """bgolly's output as a list of ((x, y), (width, height), cells)"""
+    out = []
+    with open(path) as f:
+        lines = filter(None, map(str.strip, f))
+        for line in lines:
+            if '@COLOR' in line:
+                break
+            pos = tuple(map(int, line.split(',')))
+            size = tuple(map(int, next(lines).split(',')))
+            out.append((pos, size, rle.decode(next(lines))))
+    return out
+
+
+def check(name, rule, gen, step):
+    expected = read_output(os.path.join(DATA, f'{name}.rle'))
+    pos, _, cells = expected[0]
+    got = engines.run(engines.find(rule), cells, pos, gen, step, max_work=float('inf'), max_cells=float('inf'))
+    assert len(got) == len(expected)
+    for i, ((pos, size, cells), (pos_, size_, cells_)) in enumerate(zip(expected, got)):
+        if isinstance(cells_, engines.Tiles):
+            cells_, _ = cells_.to_array()
+        width, height = size
+        # bgolly's RLE leaves off trailing dead cells
+        padded = np.zeros((height, width), np.uint8)
+        padded[:cells.shape[0], :cells.shape[1]] = cells
+        assert (pos_, size_) == (pos, size), f'generation {i * step}'
+        assert np.array_equal(cells_, padded), f'generation {i * step}'
+
+
+@pytest.mark.parametrize('name', CASES)
+def test_same_as_bgolly(name):
+    check(name, *CASES[name])
+
+
+@pytest.mark.parametrize('name', CASES)
+def test_tiled_same_as_bgolly(name, monkeypatch):
+    # only patterns far bigger than these are stepped a tile at a time for real
+    monkeypatch.setattr(engines, 'DENSE_MAX_AREA', 0)
+    monkeypatch.setattr(engines, 'TILED_MIN_AREA', 0)
+    check(name, *CASES[name])
+
+
+def test_between_dense_and_tiled_left_to_bgolly():
+    cells = np.zeros((1024, 1024), np.uint8)
+    cells[0, 0] = cells[-1, -1] = 1
+    with pytest.raises(engines.TooBig):
+        engines.run(engines.find('B3/S23'), cells, (0, 0), 1, 1, max_work=float('inf'), max_cells=float('inf'))
+
+
+def write(name, rule, gen, step, cells):
+    """Have bgolly run cells under rule and keep its output as name's"""
+    if rule.startswith('R'):
+        algo = 'Larger than Life'
+    else:
+        # (MAP rules can have slashes of their own)
+        algo = 'Generations' if rule.count('/') > 1 and not rule.startswith('MAP') else 'QuickLife'
+    with tempfile.TemporaryDirectory() as tmp:
+        infile = os.path.join(tmp, 'in.rle')
+        with open(infile, 'w') as f:
+            f.write(rle.dump(cells, rule, (0, 0), two_state=algo == 'QuickLife'))
+        subprocess.run(
+          [BGOLLY, '-a', algo, '-r', rule, '-m', str(gen), '-i', str(step), '-o', os.path.join(DATA, f'{name}.rle'), infile],
+          check=True, capture_output=True
+        )
+
+
+def main():
+    os.makedirs(DATA, exist_ok=True)
+    for seed, (name, (rule, gen, step)) in enumerate(CASES.items()):
+        path = os.path.join(DATA, f'{name}.rle')
+        if os.path.exists(path):
+            # bgolly appends
+            os.remove(path)
+        n_states = int(rule.split('/')[-1].rstrip('HV')) if rule.count('/') > 1 and not rule.startswith('MAP') else 2
+        write(name, rule, gen, step, soup(16, 0.4, seed, n_states))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Regression tests for makeframes(): its palette, and what it leaves ➕ to resume from.
+
+Needs discord.py installed for ca to import. Run from the repo root: python -m pytest tests
+"""
+import io
+
+import numpy as np
+from PIL import Image
+
+from cogs import ca
+from cogs.resources import engines
+
+BG = (54, 57, 62)
+FG = (255, 255, 255)
+
+
+def render(rule, n_states, gen=4, grid=False):
+    """makeframes() on a small soup under rule, simmed in-process"""
+    cells = (np.random.default_rng(0).random((24, 24)) < 0.5).astype(np.uint8)
+    output = engines.run(engines.find(rule), cells, (0, 0), gen, 1, max_work=float('inf'), max_cells=float('inf'))
+    _, bbox, trackmaxes = ca.parse('unused', output, 1, len(output))
+    return ca.makeframes(
+      'unused', gen, 1, bbox, 1, {'o': FG, 'b': BG}, BG, False, trackmaxes, grid, n_states, len(output), cache=output
+    )
+
+
+def first_frame(rule, n_states, grid=False):
+    """Colors in the first frame of a GIF of a small soup under rule"""
+    gif_writer, _, _ = render(rule, n_states, grid=grid)
+    im = Image.open(io.BytesIO(gif_writer.getvalue())).convert('RGB')
+    return {color for _, color in im.getcolors(1 << 24)}
+
+
+def test_c0_ltl_draws_live_cells():
+    _, n_states = ca.classify('R5,C0,M1,S34..58,B34..45,NM')
+    assert FG in first_frame('R5,C0,M1,S34..58,B34..45,NM', n_states)
+
+
+def test_zero_states_still_gets_live_cells_and_grid():
+    # as do_gif() was given for C0 rules before classify() knew better
+    colors = first_frame('R5,C0,M1,S34..58,B34..45,NM', 0, grid=True)
+    assert FG in colors and (0, 0, 0) in colors
+
+
+def test_two_states_unchanged():
+    assert first_frame('B3/S23', 2) == {BG, FG}
+
+
+def test_whole_gif_ends_on_last_generation():
+    _, cut, last = render('B3/S23', 2, gen=60)
+    assert cut is None and last is not None
+
+
+def test_subsampled_gif_has_nothing_to_resume(monkeypatch):
+    # room for only a few frames, so every nth has to be taken
+    monkeypatch.setattr(ca, 'GIF_BUDGET', 2000)
+    _, cut, last = render('B3/S23', 2, gen=60)
+    assert cut[0] == 'subsampled' and last is None
@@ -0,0 +1,144 @@
+"""
+Tests for mutils.race_event(): whichever side loses is cancelled, and no
+listener is left on the bot whichever wins.
+
+The bot is a stand-in with just what race_event() needs (`loop` and
+`_listeners`), and dispatch() resolves listeners the same way
+discord.Client.dispatch does in discord.py 1.x.
+
+Run from the repo root: python -m pytest tests
+"""
+import asyncio
+import types
+
+import pytest
+
+from cogs.resources import mutils
+
+
+def stand_in():
+    return types.SimpleNamespace(loop=asyncio.get_running_loop(), _listeners={})
+
+
+def dispatch(bot, event, *args):
+    listeners = bot._listeners.get(event)
+    if not listeners:
+        return
+    removed = []
+    for i, (future, condition) in enumerate(listeners):
+        if future.cancelled():
+            removed.append(i)
+            continue
+        if condition(*args):
+            future.set_result(args)
+            removed.append(i)
+    if len(removed) == len(listeners):
+        bot._listeners.pop(event)
+    else:
+        for idx in reversed(removed):
+            del listeners[idx]
+
+
+def never(*_):
+    return False
+
+
+async def work():
+    await asyncio.sleep(0)
+    return 'done'
+
+
+class Sleeper:
+    """A coroutine to race that never finishes by itself, and notes whether it was cancelled and let clean up"""
+
+    def __init__(self):
+        self.cancelled = self.cleaned_up = False
+
+    async def run(self):
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        finally:
+            await asyncio.sleep(0)
+            self.cleaned_up = True
+
+
+def test_coro_wins_and_leaves_no_listeners():
+    async def main():
+        bot = stand_in()
+        for _ in range(100):
+            assert await mutils.race_event(bot, 'reaction_add', work(), check=never) == ('coro', 'done')
+        return bot._listeners
+
+    assert asyncio.run(main()) == {}
+
+
+def test_event_wins_and_cancels_coro():
+    async def main():
+        bot = stand_in()
+        sleeper = Sleeper()
+        race = asyncio.ensure_future(mutils.race_event(bot, 'reaction_add', sleeper.run()))
+        await asyncio.sleep(0)
+        dispatch(bot, 'reaction_add', 'rxn', 'usr')
+        return await race, sleeper, bot._listeners
+
+    result, sleeper, listeners = asyncio.run(main())
+    assert result == ('event', ('rxn', 'usr'))
+    assert sleeper.cancelled and sleeper.cleaned_up
+    assert listeners == {}
+
+
+def test_check_filters_events():
+    async def main():
+        bot = stand_in()
+        race = asyncio.ensure_future(
+          mutils.race_event(bot, 'reaction_add', Sleeper().run(), check=lambda rxn, usr: rxn == 'mine')
+        )
+        await asyncio.sleep(0)
+        dispatch(bot, 'reaction_add', 'theirs', 'usr')
+        await asyncio.sleep(0)
+        assert not race.done()
+        dispatch(bot, 'reaction_add', 'mine', 'usr')
+        return await race
+
+    assert asyncio.run(main()).winner == 'event'
+
+
+def test_timeout_cancels_both():
+    async def main():
+        bot = stand_in()
+        sleeper = Sleeper()
+        with pytest.raises(asyncio.TimeoutError):
+            await mutils.race_event(bot, 'reaction_add', sleeper.run(), timeout=0.01)
+        return sleeper, bot._listeners
+
+    sleeper, listeners = asyncio.run(main())
+    assert sleeper.cancelled and sleeper.cleaned_up
+    assert listeners == {}
+
+
+def test_coro_raising_leaves_no_listeners():
+    async def fail():
+        raise ValueError('bad pattern')
+
+    async def main():
+        bot = stand_in()
+        with pytest.raises(ValueError):
+            await mutils.race_event(bot, 'reaction_add', fail())
+        return bot._listeners
+
+    assert asyncio.run(main()) == {}
+
+
+def test_other_listeners_kept():
+    async def main():
+        bot = stand_in()
+        other = bot.loop.create_future(), never
+        bot._listeners['reaction_add'] = [other]
+        await mutils.race_event(bot, 'reaction_add', work())
+        return bot._listeners['reaction_add'], other
+
+    listeners, other = asyncio.run(main())
+    assert listeners == [other]